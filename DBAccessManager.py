@@ -1,8 +1,14 @@
 # dbaccess class for accessing MySQL database.
+import csv
+import itertools
+import os
+import tempfile
+from urllib.parse import quote_plus
 import mysql.connector
 from mysql.connector import Error
 import logging
 
+
 class DBAccessManager:
     def __init__(self, host, user, password, database):
         self.host = host
@@ -10,6 +16,8 @@ class DBAccessManager:
         self.password = password
         self.database = database
         self.connection = None
+        # pandas.read_sql용 SQLAlchemy 엔진 (처음 사용할 때 생성, 커넥션 풀 공유)
+        self._sqlalchemy_engine = None
 
     def connect_to_mysql(self):
             """Connect to MySQL database (재연결 방지)"""
@@ -20,7 +28,8 @@ class DBAccessManager:
                     host=self.host,
                     user=self.user,
                     password=self.password,
-                    database=self.database
+                    database=self.database,
+                    allow_local_infile=True
                 )
                 if self.connection.is_connected():
                     db_info = self.connection.get_server_info()
@@ -36,33 +45,145 @@ class DBAccessManager:
             logging.error("데이터베이스에 연결되어 있지 않습니다.")
             return None
         
-        cursor = self.connection.cursor()
         try:
-            cursor.execute(query, params)
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, params)
             self.connection.commit()
+            return True
         except Error as e:
             logging.error(f"Query execution failed: {e}")
             return None
-        finally:
-            cursor.close()
 
-    def execute_many_query(self, query, params_list):
-        """ executemany를 사용하여 여러 데이터를 한번에 추가 """
+    def execute_many_query(self, query, params_list, commit=True):
+        """ executemany를 사용하여 여러 데이터를 한번에 추가 (commit=False이면 호출 측에서 commit/rollback) """
         if not self.connection or not self.connection.is_connected():
             logging.error("데이터베이스에 연결되어 있지 않습니다.")
             return None
         
-        cursor = self.connection.cursor()
         try:
-            cursor.executemany(query, params_list)
-            self.connection.commit()
-            logging.info(f"{cursor.rowcount} records were inserted.")
+            with self.connection.cursor() as cursor:
+                cursor.executemany(query, params_list)
+                if commit:
+                    self.connection.commit()
+                logging.info(f"{cursor.rowcount} records were inserted.")
             return cursor
         except Error as e:
             logging.error(f"Execute many query failed: {e}")
             return None
+
+    def execute_multi_row_insert(self, insert_clause, rows, suffix='', chunk_size=1000, commit=True):
+        """ 여러 행을 하나의 INSERT ... VALUES (...),(...) 문으로 묶어 chunk_size 행 단위로 실행
+
+        insert_clause 예: "INSERT INTO prices (company_id, trade_date) VALUES"
+        suffix 예: "ON DUPLICATE KEY UPDATE trade_date = VALUES(trade_date)"
+        commit=False이면 커밋하지 않으므로 호출 측에서 commit()으로 트랜잭션을 마무리해야 합니다.
+        """
+        if not self.connection or not self.connection.is_connected():
+            logging.error("데이터베이스에 연결되어 있지 않습니다.")
+            return None
+        if not rows:
+            return 0
+
+        row_placeholder = '(' + ', '.join(['%s'] * len(rows[0])) + ')'
+        try:
+            affected = 0
+            with self.connection.cursor() as cursor:
+                for i in range(0, len(rows), chunk_size):
+                    chunk = rows[i:i + chunk_size]
+                    query = f"{insert_clause} {', '.join([row_placeholder] * len(chunk))} {suffix}"
+                    cursor.execute(query, list(itertools.chain.from_iterable(chunk)))
+                    affected += cursor.rowcount
+            if commit:
+                self.connection.commit()
+            return affected
+        except Error as e:
+            logging.error(f"Multi-row insert failed: {e}")
+            return None
+
+    def commit(self):
+        """ 현재 트랜잭션 커밋 """
+        if self.connection and self.connection.is_connected():
+            self.connection.commit()
+
+    def rollback(self):
+        """ 현재 트랜잭션 롤백 """
+        if self.connection and self.connection.is_connected():
+            self.connection.rollback()
+
+    def load_data_infile(self, table, columns, rows, commit=True):
+        """ 임시 CSV 파일을 만들어 LOAD DATA LOCAL INFILE로 대량 적재 (서버에서 local_infile 허용 필요)
+        commit=False이면 커밋하지 않으므로 호출 측에서 commit()/rollback()으로 트랜잭션을 마무리해야 합니다.
+        """
+        if not self.connection or not self.connection.is_connected():
+            logging.error("데이터베이스에 연결되어 있지 않습니다.")
+            return None
+
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                # None은 LOAD DATA의 NULL 표기(\N)로 기록
+                writer.writerows(tuple('\\N' if v is None else v for v in row) for row in rows)
+
+            query = (
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                "CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(columns)})"
+            )
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, (path,))
+                if commit:
+                    self.connection.commit()
+                logging.info(f"{cursor.rowcount} records were loaded into {table}.")
+            return True
+        except Error as e:
+            logging.error(f"LOAD DATA failed: {e}")
+            return None
         finally:
-            cursor.close()
+            os.remove(path)
+
+    def upsert_via_staging(self, table, staging, columns, rows, suffix='', commit=True):
+        """ rows를 LOAD DATA로 세션 전용 임시 테이블(staging)에 적재한 뒤 INSERT…SELECT 한 번으로 table에 병합
+
+        staging은 CREATE TEMPORARY TABLE … LIKE table로 연결마다 따로 만들고 사용 후 삭제하므로
+        동시에 실행되는 다른 프로세스와 충돌하지 않으며, 임시 테이블 생성/삭제는 암묵적 커밋을 일으키지 않습니다.
+        LOAD DATA를 쓸 수 없으면(local_infile 비활성 등) multi-row INSERT로 대체합니다.
+        suffix 예: "ON DUPLICATE KEY UPDATE close_price = VALUES(close_price)"
+        commit=False이면 커밋하지 않으므로 호출 측에서 commit()/rollback()으로 트랜잭션을 마무리해야 합니다.
+        """
+        if not self.connection or not self.connection.is_connected():
+            logging.error("데이터베이스에 연결되어 있지 않습니다.")
+            return None
+        if not rows:
+            return 0
+
+        column_list = ', '.join(columns)
+        merged = None
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+                cursor.execute(f"CREATE TEMPORARY TABLE {staging} LIKE {table}")
+            if self.load_data_infile(staging, columns, rows, commit=False):
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} {suffix}")
+                    merged = cursor.rowcount
+        except Error as e:
+            logging.error(f"Staging merge into {table} failed: {e}")
+        finally:
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+            except Error as e:
+                logging.warning(f"Failed to drop temporary table {staging}: {e}")
+
+        if merged is not None:
+            if commit:
+                self.connection.commit()
+            logging.info(f"LOAD DATA로 {len(rows)}건을 {table}에 병합했습니다.")
+            return merged
+
+        logging.warning(f"LOAD DATA 적재에 실패하여 {table}에 multi-row INSERT로 저장합니다.")
+        return self.execute_multi_row_insert(f"INSERT INTO {table} ({column_list}) VALUES", rows, suffix, commit=commit)
 
     def fetch_one(self, query, params=None):
         """쿼리 실행 후 하나의 결과를 반환"""
@@ -70,16 +191,13 @@ class DBAccessManager:
             logging.error("데이터베이스에 연결되어 있지 않습니다.")
             return None
         
-        cursor = self.connection.cursor()
         try:
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            return result
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchone()
         except Error as e:
             logging.error(f"Query execution failed: {e}")
             return None
-        finally:
-            cursor.close()
 
     def fetch_all(self, query, params=None):
         """쿼리 실행 후 모든 결과를 반환"""
@@ -87,17 +205,61 @@ class DBAccessManager:
             logging.error("데이터베이스에 연결되어 있지 않습니다.")
             return None
         
-        cursor = self.connection.cursor()
         try:
-            cursor.execute(query, params)
-            result = cursor.fetchall()
-            return result
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
         except Error as e:
             logging.error(f"Query execution failed: {e}")
             return None
-        finally:
-            cursor.close()
+
+    def fetch_iter(self, query, params=None, size=1000):
+        """서버 측(unbuffered) 커서로 결과를 size개씩 나누어 반환 (전체 결과를 메모리에 올리지 않음)
+
+        조회 도중 오류(연결 끊김 등)가 나면 기록 후 예외를 다시 발생시킵니다.
+        이미 받은 청크만으로 결과를 확정하지 않도록 호출 측에서 처리해야 합니다.
+        """
+        if not self.connection or not self.connection.is_connected():
+            logging.error("데이터베이스에 연결되어 있지 않습니다.")
+            return
+
+        try:
+            with self.connection.cursor(buffered=False) as cursor:
+                try:
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(size)
+                        if not rows:
+                            break
+                        yield rows
+                finally:
+                    # 중간에 소비를 멈춘 경우 남은 결과를 비워야 커서를 닫고 다음 쿼리를 실행할 수 있음
+                    if self.connection.unread_result:
+                        self.connection.consume_results()
+        except Error as e:
+            logging.error(f"Query execution failed: {e}")
+            raise
+
+    def get_sqlalchemy_engine(self):
+        """ pandas.read_sql에 사용할 SQLAlchemy 엔진 (커넥션 풀, 인스턴스당 1개) """
+        if self._sqlalchemy_engine is None:
+            from sqlalchemy import create_engine
+            url = f"mysql+mysqlconnector://{quote_plus(self.user or '')}:{quote_plus(self.password or '')}@{self.host}/{self.database}"
+            self._sqlalchemy_engine = create_engine(url, pool_size=8, pool_pre_ping=True, pool_recycle=3600)
+        return self._sqlalchemy_engine
+
+    def read_sql(self, query, params=None, chunksize=None):
+        """ 쿼리 결과를 DataFrame으로 반환 (chunksize를 주면 DataFrame 반복자), 실패 시 None """
+        import pandas as pd
+        try:
+            return pd.read_sql(query, self.get_sqlalchemy_engine(), params=params, chunksize=chunksize)
+        except Exception as e:
+            logging.error(f"read_sql failed: {e}")
+            return None
 
     def close_connection(self):
+        if self._sqlalchemy_engine is not None:
+            self._sqlalchemy_engine.dispose()
+            self._sqlalchemy_engine = None
         if self.connection and self.connection.is_connected():
             self.connection.close()
\ No newline at end of file
@@ -1,6 +1,6 @@
 import logging
 import requests
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
 import datetime
 import FinanceDataReader as fdr
 import pandas as pd
@@ -8,6 +8,30 @@ import os
 from AppManager import get_db_connection
 
 class ETFManager:
+    ETF_PRICE_COLUMNS = ('etf_id', 'trade_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+    ETF_PRICES_UPSERT_SUFFIX = (
+        "ON DUPLICATE KEY UPDATE open_price = VALUES(open_price), high_price = VALUES(high_price), "
+        "low_price = VALUES(low_price), close_price = VALUES(close_price), volume = VALUES(volume)"
+    )
+    ETF_PRICES_UPSERT_QUERY = (
+        "INSERT INTO etf_prices (etf_id, trade_date, open_price, high_price, low_price, close_price, volume) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s) " + ETF_PRICES_UPSERT_SUFFIX
+    )
+    # 백필 행이 이 수만큼 모이면 LOAD DATA로 적재
+    BULK_LOAD_ROWS = 100_000
+    # 증분 시세는 여러 ETF를 합쳐 이 행 수마다 한 번 저장/커밋
+    PRICE_FLUSH_ROWS = 10_000
+
+    # Naver 종목 상세 페이지의 총보수 / 분배율 값 셀
+    TER_XPATH = (
+        "(//div[contains(concat(' ', normalize-space(@class), ' '), ' summary_info ')]"
+        "//th[contains(., '총보수')]/following-sibling::td[1])[1]"
+    )
+    DIVIDEND_YIELD_XPATH = (
+        "(//div[contains(concat(' ', normalize-space(@class), ' '), ' chart_info ')]"
+        "//dt[contains(., '분배율')]/following-sibling::dd[1])[1]"
+    )
+
     def __init__(self, db_manager):
         self.db_manager = db_manager
 
@@ -172,10 +196,12 @@ class ETFManager:
             logging.info("ETF 일별 시세 저장을 시작합니다...")
             
             query = "SELECT id, code FROM etf_info"
+            params = ()
             if limit:
-                query += f" LIMIT {limit}"
+                query += " LIMIT %s"
+                params = (int(limit),)
             
-            etfs = self.db_manager.fetch_all(query)
+            etfs = self.db_manager.fetch_all(query, params)
             if not etfs:
                 logging.warning("시세를 저장할 ETF 종목이 없습니다.")
                 return
@@ -185,15 +211,20 @@ class ETFManager:
             if not start_date:
                 start_date = (datetime.date.today() - datetime.timedelta(days=365)).strftime('%Y-%m-%d')
 
+            # ETF별 마지막 저장 날짜를 한 번에 조회
+            last_date_rows = self.db_manager.fetch_all("SELECT etf_id, MAX(trade_date) FROM etf_prices GROUP BY etf_id")
+            last_dates = dict(last_date_rows) if last_date_rows else {}
+
+            # 저장된 시세가 없는(신규 백필) ETF는 모아서 LOAD DATA로 적재
+            backfill_rows = []
+            # 증분 시세 행 버퍼 (여러 ETF 합산, ETF마다 커밋하지 않음)
+            pending_rows = []
             for etf_id, code in etfs:
                 try:
-                    # 마지막 저장된 날짜 확인
-                    last_date_query = "SELECT MAX(trade_date) FROM etf_prices WHERE etf_id = %s"
-                    last_date_row = self.db_manager.fetch_one(last_date_query, (etf_id,))
-                    
                     fetch_start_date = start_date
-                    if last_date_row and last_date_row[0]:
-                        fetch_start_date = (last_date_row[0] + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+                    last_date = last_dates.get(etf_id)
+                    if last_date:
+                        fetch_start_date = (last_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
                     
                     if fetch_start_date > datetime.date.today().strftime('%Y-%m-%d'):
                         continue
@@ -203,18 +234,52 @@ class ETFManager:
                     if df is None or df.empty:
                         continue
                     
-                    prices_to_insert = [(etf_id, date.strftime('%Y-%m-%d'), float(row['Open']), float(row['High']), float(row['Low']), float(row['Close']), int(row['Volume'])) for date, row in df.iterrows()]
+                    # 컬럼 단위로 한 번에 변환 (행별 Series를 만드는 iterrows 대신)
+                    dates = df.index.strftime('%Y-%m-%d').tolist()
+                    prices_to_insert = list(zip(
+                        [etf_id] * len(df), dates,
+                        df['Open'].to_numpy(dtype='float64').tolist(), df['High'].to_numpy(dtype='float64').tolist(),
+                        df['Low'].to_numpy(dtype='float64').tolist(), df['Close'].to_numpy(dtype='float64').tolist(),
+                        df['Volume'].to_numpy(dtype='int64').tolist()
+                    ))
                     
-                    if prices_to_insert:
-                        query = "INSERT INTO etf_prices (etf_id, trade_date, open_price, high_price, low_price, close_price, volume) VALUES (%s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE open_price = VALUES(open_price), high_price = VALUES(high_price), low_price = VALUES(low_price), close_price = VALUES(close_price), volume = VALUES(volume)"
-                        self.db_manager.execute_many_query(query, prices_to_insert)
-                        logging.info(f"[{code}] ETF {len(prices_to_insert)}일치 시세 저장 완료.")
+                    if prices_to_insert and not last_date:
+                        backfill_rows.extend(prices_to_insert)
+                        logging.info(f"[{code}] ETF {len(prices_to_insert)}일치 시세를 백필 적재 대기열에 추가.")
+                        if len(backfill_rows) >= self.BULK_LOAD_ROWS:
+                            self._bulk_load_prices(backfill_rows)
+                            backfill_rows = []
+                    elif prices_to_insert:
+                        pending_rows.extend(prices_to_insert)
+                        logging.info(f"[{code}] ETF {len(prices_to_insert)}일치 시세 수집 완료.")
+                        if len(pending_rows) >= self.PRICE_FLUSH_ROWS:
+                            self._flush_price_rows(pending_rows)
+                            pending_rows = []
                 except Exception as e:
                     logging.error(f"[{code}] ETF 시세 저장 중 오류: {e}")
+            if pending_rows:
+                self._flush_price_rows(pending_rows)
+            if backfill_rows:
+                self._bulk_load_prices(backfill_rows)
             logging.info("ETF 일별 시세 저장 작업 완료.")
         except Exception as e:
+            self.db_manager.rollback()
             logging.error(f"ETF save_daily_prices 실행 중 오류 발생: {e}")
 
+    def _flush_price_rows(self, rows):
+        """여러 ETF의 증분 시세 행을 한 트랜잭션으로 저장 (executemany 후 커밋 1회)"""
+        if self.db_manager.execute_many_query(self.ETF_PRICES_UPSERT_QUERY, rows, commit=False) is None:
+            self.db_manager.rollback()
+            return
+        self.db_manager.commit()
+        logging.info(f"ETF 시세 {len(rows)}건을 저장했습니다.")
+
+    def _bulk_load_prices(self, rows):
+        """ETF 시세 행을 LOAD DATA로 임시 staging 테이블에 적재한 뒤 INSERT…SELECT로 etf_prices에 병합 (실패 시 multi-row INSERT)"""
+        self.db_manager.upsert_via_staging(
+            'etf_prices', 'etf_prices_staging', self.ETF_PRICE_COLUMNS, rows, self.ETF_PRICES_UPSERT_SUFFIX
+        )
+
     def update_etf_names_from_naver(self):
         """
         Fetches ETF names from Naver Finance API and updates them in the database.
@@ -328,28 +393,24 @@ class ETFManager:
                 res = requests.get(detail_url, headers=headers)
                 res.raise_for_status()
                 
-                # Parsing with BeautifulSoup
-                soup = BeautifulSoup(res.text, 'html.parser')
+                # Parsing with lxml (XPath)
+                doc = lxml_html.fromstring(res.text)
 
                 # 총보수 (Total Expense Ratio)
-                summary_info = soup.find('div', class_='summary_info')
-                if summary_info:
-                    # '총보수'라는 텍스트를 포함하는 th를 찾고, 그 다음 td의 값을 가져옴
-                    th = summary_info.find('th', string=lambda text: text and '총보수' in text)
-                    if th and th.find_next_sibling('td'):
-                        ter_text = th.find_next_sibling('td').get_text(strip=True)
-                        # '%' 문자를 제거하고 숫자로 변환
-                        total_expense_ratio = float(ter_text.replace('%', ''))
+                # summary_info 안에서 '총보수'라는 텍스트를 포함하는 th를 찾고, 그 다음 td의 값을 가져옴
+                ter_cells = doc.xpath(self.TER_XPATH)
+                if ter_cells:
+                    ter_text = ter_cells[0].text_content().strip()
+                    # '%' 문자를 제거하고 숫자로 변환
+                    total_expense_ratio = float(ter_text.replace('%', ''))
 
                 # 분배율 (Dividend Yield)
-                chart_info = soup.find('div', class_='chart_info')
-                if chart_info:
-                    # '분배율' 텍스트를 가진 dt를 찾고, 그 다음 dd의 값을 가져옴
-                    dt = chart_info.find('dt', string=lambda text: text and '분배율' in text)
-                    if dt and dt.find_next_sibling('dd'):
-                        dy_text = dt.find_next_sibling('dd').get_text(strip=True)
-                        # '%' 문자를 제거하고 숫자로 변환
-                        dividend_yield = float(dy_text.replace('%', ''))
+                # chart_info 안에서 '분배율' 텍스트를 가진 dt를 찾고, 그 다음 dd의 값을 가져옴
+                dy_cells = doc.xpath(self.DIVIDEND_YIELD_XPATH)
+                if dy_cells:
+                    dy_text = dy_cells[0].text_content().strip()
+                    # '%' 문자를 제거하고 숫자로 변환
+                    dividend_yield = float(dy_text.replace('%', ''))
                 
                 logging.info(f"Scraped details for {code}: TER={total_expense_ratio}, DY={dividend_yield}")
 
@@ -17,6 +17,8 @@ class PortfolioManager:
         self.etf_manager = etf_manager
         self.target_sheets = ['CMA', '개인연금', '퇴직연금']
         self.sheet_configs = {}
+        # {file path: (mtime_ns, {sheet name: raw DataFrame})} — re-parse only when the file changes
+        self._sheet_cache = {}
 
     # --- Private Helper Methods ---
 
@@ -112,32 +114,55 @@ class PortfolioManager:
                         price_col_idx = header.index('현재가') + 1
                     except ValueError:
                         continue
-                    for row_idx in range(header_row_num + 1, sheet.max_row + 1):
-                        ticker_cell = sheet.cell(row=row_idx, column=code_col_idx)
-                        ticker = str(ticker_cell.value).zfill(6) if ticker_cell.value else None
+                    # Walk the data rows once and index each row's cell tuple instead of calling sheet.cell() per lookup
+                    max_col = max(code_col_idx, price_col_idx)
+                    for row in sheet.iter_rows(min_row=header_row_num + 1, max_row=sheet.max_row, max_col=max_col):
+                        ticker_value = row[code_col_idx - 1].value
+                        ticker = str(ticker_value).zfill(6) if ticker_value else None
                         if ticker and ticker in prices_for_date:
-                            price_cell = sheet.cell(row=row_idx, column=price_col_idx)
+                            price_cell = row[price_col_idx - 1]
                             price_cell.value = prices_for_date[ticker]
                             price_cell.font = blue_font
                 elif config['orientation'] == 'vertical':
                     header_col_num = config['header_idx'] + 1
                     try:
-                        header = [sheet.cell(row=i, column=header_col_num).value for i in range(1, sheet.max_row + 1)]
+                        header = [cell.value for cell in next(sheet.iter_cols(min_col=header_col_num, max_col=header_col_num))]
                         code_row_idx = header.index('코드') + 1
                         price_row_idx = header.index('현재가') + 1
                     except ValueError:
                         continue
-                    for col_idx in range(header_col_num + 1, sheet.max_column + 1):
-                        ticker_cell = sheet.cell(row=code_row_idx, column=col_idx)
-                        ticker = str(ticker_cell.value).zfill(6) if ticker_cell.value else None
+                    max_row = max(code_row_idx, price_row_idx)
+                    for col in sheet.iter_cols(min_col=header_col_num + 1, max_col=sheet.max_column, max_row=max_row):
+                        ticker_value = col[code_row_idx - 1].value
+                        ticker = str(ticker_value).zfill(6) if ticker_value else None
                         if ticker and ticker in prices_for_date:
-                            price_cell = sheet.cell(row=price_row_idx, column=col_idx)
+                            price_cell = col[price_row_idx - 1]
                             price_cell.value = prices_for_date[ticker]
                             price_cell.font = blue_font
 
         except (KeyError, Exception) as e:
             logging.error(f"Failed to update sheets: {e}")
 
+    def _read_target_sheets(self, file_path):
+        """Parses all target sheets once (header=None, cell values as read) and caches them by file mtime."""
+        mtime_ns = os.stat(file_path).st_mtime_ns
+        cached = self._sheet_cache.get(file_path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+
+        xls = pd.ExcelFile(file_path)
+        sheet_names = [name for name in self.target_sheets if name in xls.sheet_names]
+        sheets = pd.read_excel(xls, sheet_name=sheet_names, header=None, dtype=object) if sheet_names else {}
+        self._sheet_cache[file_path] = (mtime_ns, sheets)
+        return sheets
+
+    @staticmethod
+    def _extract_codes(header_values, table):
+        """Returns zero-padded tickers from the '코드' column of a table whose header is header_values."""
+        labels = [str(v).strip() for v in header_values]
+        codes = table.iloc[:, labels.index('코드')].dropna()
+        return codes.astype(str).str.zfill(6).tolist()
+
     # --- Public Methods ---
 
     def get_mysql_data_type(self, dtype):
@@ -152,13 +177,14 @@ class PortfolioManager:
         """
         all_tickers = set()
         try:
-            xls = pd.ExcelFile(file_path)
+            # Each workbook is parsed once per modification; header detection and extraction reuse the raw sheets
+            sheets = self._read_target_sheets(file_path)
             for sheet_name in self.target_sheets:
-                if sheet_name not in xls.sheet_names:
+                if sheet_name not in sheets:
                     logging.warning(f"'{sheet_name}' 시트를 찾을 수 없습니다.")
                     continue
 
-                df_full = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+                df_full = sheets[sheet_name]
                 found_header = False
 
                 # 1. Try to find header in rows (horizontal orientation)
@@ -166,11 +192,9 @@ class PortfolioManager:
                     row_values = [str(v).strip() for v in row.dropna().tolist()]
                     if '코드' in row_values and '종목' in row_values:
                         self.sheet_configs[sheet_name] = {'header_idx': i, 'orientation': 'horizontal'}
-                        df = pd.read_excel(file_path, sheet_name=sheet_name, header=i, dtype={'코드': str})
-                        if '코드' in df.columns:
-                            tickers = df['코드'].dropna().astype(str).apply(lambda x: x.zfill(6)).tolist()
-                            all_tickers.update(tickers)
-                            logging.info(f"'{file_path}' 파일의 '{sheet_name}' 시트에서 수평 방향으로 {len(tickers)}개의 티커를 추출했습니다. (헤더 행: {i + 1})")
+                        tickers = self._extract_codes(row.tolist(), df_full.iloc[i + 1:])
+                        all_tickers.update(tickers)
+                        logging.info(f"'{file_path}' 파일의 '{sheet_name}' 시트에서 수평 방향으로 {len(tickers)}개의 티커를 추출했습니다. (헤더 행: {i + 1})")
                         found_header = True
                         break
 
@@ -182,15 +206,9 @@ class PortfolioManager:
                     row_values = [str(v).strip() for v in row.dropna().tolist()]
                     if '코드' in row_values and '종목' in row_values:
                         self.sheet_configs[sheet_name] = {'header_idx': i, 'orientation': 'vertical'}
-                        df = pd.read_excel(file_path, sheet_name=sheet_name, header=None).T
-                        df.columns = df.iloc[i]
-                        df = df.iloc[i+1:]
-                        df = df.rename(columns={'코드': '코드_val'})
-                        
-                        if '코드_val' in df.columns:
-                            tickers = df['코드_val'].dropna().astype(str).apply(lambda x: x.zfill(6)).tolist()
-                            all_tickers.update(tickers)
-                            logging.info(f"'{file_path}' 파일의 '{sheet_name}' 시트에서 수직 방향으로 {len(tickers)}개의 티커를 추출했습니다. (헤더 열: {i + 1})")
+                        tickers = self._extract_codes(row.tolist(), df_transposed.iloc[i + 1:])
+                        all_tickers.update(tickers)
+                        logging.info(f"'{file_path}' 파일의 '{sheet_name}' 시트에서 수직 방향으로 {len(tickers)}개의 티커를 추출했습니다. (헤더 열: {i + 1})")
                         found_header = True
                         break
 
@@ -241,6 +259,8 @@ class PortfolioManager:
             last_trade_dates = {cid: date for cid, date in last_dates_raw} if last_dates_raw else {}
 
         # 4. Fetch and save price data for each ticker
+        today = datetime.date.today()
+        price_query = f"INSERT INTO {table_name} ({id_column}, trade_date, open_price, high_price, low_price, close_price, volume) VALUES (%s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE open_price=VALUES(open_price), high_price=VALUES(high_price), low_price=VALUES(low_price), close_price=VALUES(close_price), volume=VALUES(volume)"
         for ticker in target_tickers:
             db_id = id_map.get(ticker)
             if not db_id:
@@ -248,21 +268,29 @@ class PortfolioManager:
                 continue
 
             last_date = last_trade_dates.get(db_id)
+            # Already up to date: no new bar can exist, so skip the request entirely
+            if last_date and last_date >= today:
+                continue
             fetch_start_date = (last_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d') if last_date else fetch_start_date_overall
             
             logging.info(f"[{ticker}] Fetching price data from {fetch_start_date}")
             try:
                 df = fdr.DataReader(ticker, start=fetch_start_date)
-                if not df.empty:
-                    data_to_insert = [(db_id, date.strftime('%Y-%m-%d'), row['Open'], row['High'], row['Low'], row['Close'], row['Volume']) for date, row in df.iterrows()]
-                if not df.empty and data_to_insert:
-                    price_query = f"INSERT INTO {table_name} ({id_column}, trade_date, open_price, high_price, low_price, close_price, volume) VALUES (%s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE open_price=VALUES(open_price), high_price=VALUES(high_price), low_price=VALUES(low_price), close_price=VALUES(close_price), volume=VALUES(volume)"
-                    self.db_manager.execute_many_query(price_query, data_to_insert)
-                    logging.info(f"[{ticker}] Inserted/updated {len(data_to_insert)} price records into {table_name}.")
-                else:
+                if df is None or len(df) == 0:
                     logging.info(f"[{ticker}] No new price data found.")
+                    continue
+
+                # Format dates and convert values column-wise instead of per row via iterrows
+                dates = df.index.strftime('%Y-%m-%d').tolist()
+                ohlc = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype='float64').tolist()
+                volumes = df['Volume'].to_numpy(dtype='int64').tolist()
+                data_to_insert = [(db_id, d, o, h, l, c, v) for d, (o, h, l, c), v in zip(dates, ohlc, volumes)]
+                # Commit once after the loop instead of once per ticker
+                if self.db_manager.execute_many_query(price_query, data_to_insert, commit=False) is not None:
+                    logging.info(f"[{ticker}] Inserted/updated {len(data_to_insert)} price records into {table_name}.")
             except Exception as e:
                 logging.error(f"Error fetching or saving price data for {ticker}: {e}")
+        self.db_manager.commit()
 
     def import_portfolio_from_excel(self, file_path, table_name):
         try:
@@ -4,8 +4,6 @@ import datetime
 import os
 import FinanceDataReader as fdr
 from AppManager import get_db_connection
-from openpyxl.styles import PatternFill, Font
-from sqlalchemy import create_engine
 
 class Screener:
     """
@@ -19,14 +17,6 @@ class Screener:
             db_access (dbaccess): 데이터베이스 접근을 위한 dbaccess 객체
         """
         self.db_access = db_access
-        # pandas 경고를 해결하기 위해 SQLAlchemy 엔진 생성
-        db_info = {
-            'user': os.getenv('DB_USER'),
-            'password': os.getenv('DB_PASSWORD'),
-            'host': os.getenv('DB_HOST'),
-            'database': os.getenv('DB_NAME')
-        }
-        self.engine = create_engine(f"mysql+mysqlconnector://{db_info['user']}:{db_info['password']}@{db_info['host']}/{db_info['database']}")
 
     def find_leading_stocks(self, top_n=50, min_marcap_억=500, require_ma_alignment=False):
         """
@@ -81,11 +71,13 @@ class Screener:
             WHERE p.trade_date >= %s
             ORDER BY c.code, p.trade_date
         """
-        price_df = pd.read_sql(price_query, self.engine, params=(start_date,))
-        if price_df.empty:
+        price_df = self.db_access.read_sql(price_query, params=(start_date,))
+        if price_df is None or price_df.empty:
             logging.warning("가격 데이터가 없습니다.")
             return None
         price_df['trade_date'] = pd.to_datetime(price_df['trade_date']).dt.normalize()
+        # DECIMAL 컬럼(Decimal 객체)은 컬럼 단위로 한 번에 숫자 변환 (NULL은 NaN)
+        price_df[['close_price', 'volume']] = price_df[['close_price', 'volume']].apply(pd.to_numeric, errors='coerce')
 
         # code → name 매핑
         name_map = price_df.drop_duplicates('code').set_index('code')['name'].to_dict()
@@ -102,7 +94,10 @@ class Screener:
                 SELECT code, MAX(date) AS max_date FROM daily_financials GROUP BY code
             ) ldf ON df.code = ldf.code AND df.date = ldf.max_date
         """
-        fin_df = pd.read_sql(fin_query, self.engine)
+        fin_df = self.db_access.read_sql(fin_query)
+        if fin_df is None:
+            fin_df = pd.DataFrame(columns=['code', 'marcap', 'beta'])
+        fin_df[['marcap', 'beta']] = fin_df[['marcap', 'beta']].apply(pd.to_numeric, errors='coerce')
 
         # 4. 기준일 가격 추출 헬퍼
         def price_n_days_ago(pivot, n_calendar_days):
@@ -115,80 +110,70 @@ class Screener:
         price_3m  = price_n_days_ago(close_pivot, 91)
         price_6m  = price_n_days_ago(close_pivot, 182)
 
-        # 5. 종목별 지표 계산
+        # 5. 종목별 지표 계산 (날짜 × 종목 피벗 전체에 대해 컬럼 단위로 한 번에 계산)
         logging.info("종목별 지표를 계산합니다...")
-        results = []
-        for code in close_pivot.columns:
-            prices = close_pivot[code].dropna()
-            if len(prices) < 30:
-                continue
-
-            p_now = price_now.get(code)
-            if not p_now or p_now <= 0:
-                continue
-
-            def ret_pct(p_past):
-                v = p_past.get(code) if p_past is not None else None
-                return (p_now - v) / v * 100 if v and v > 0 else None
-
-            ret_1m = ret_pct(price_1m)
-            ret_3m = ret_pct(price_3m)
-            ret_6m = ret_pct(price_6m)
-
-            rs_1m = (ret_1m - k_1m) if ret_1m is not None else None
-            rs_3m = (ret_3m - k_3m) if ret_3m is not None else None
-            rs_6m = (ret_6m - k_6m) if ret_6m is not None else None
-
-            # 복합 RS: 1M 40% + 3M 35% + 6M 25%
-            weighted = [(rs_1m, 0.40), (rs_3m, 0.35), (rs_6m, 0.25)]
-            valid = [(v, w) for v, w in weighted if v is not None]
-            if not valid:
-                continue
-            rs_composite = sum(v * w for v, w in valid) / sum(w for _, w in valid)
-
-            # 이평선 정배열
-            n = len(prices)
-            ma20  = float(prices.tail(20).mean())  if n >= 20  else None
-            ma60  = float(prices.tail(60).mean())  if n >= 60  else None
-            ma120 = float(prices.tail(120).mean()) if n >= 120 else None
-            ma_aligned = bool(
-                ma20 and ma60 and ma120 and
-                p_now > ma20 > ma60 > ma120
-            )
-
-            # 52주 신고가 근접도
-            high_52w = float(prices.tail(252).max())
-            proximity_52w = round(p_now / high_52w * 100, 1) if high_52w > 0 else None
-
-            # 거래량 급증비
-            vols = vol_pivot[code].dropna()
-            vol_surge = None
-            if len(vols) >= 60:
-                avg20 = vols.tail(20).mean()
-                avg60 = vols.tail(60).mean()
-                vol_surge = round(float(avg20 / avg60), 2) if avg60 > 0 else None
-
-            results.append({
-                'code':           code,
-                'name':           name_map.get(code, code),
-                'current_price':  round(p_now),
-                'ret_1m':         round(ret_1m, 2) if ret_1m is not None else None,
-                'ret_3m':         round(ret_3m, 2) if ret_3m is not None else None,
-                'ret_6m':         round(ret_6m, 2) if ret_6m is not None else None,
-                'rs_1m':          round(rs_1m,  2) if rs_1m  is not None else None,
-                'rs_3m':          round(rs_3m,  2) if rs_3m  is not None else None,
-                'rs_6m':          round(rs_6m,  2) if rs_6m  is not None else None,
-                'rs_composite':   round(rs_composite, 2),
-                'ma_aligned':     ma_aligned,
-                'proximity_52w':  proximity_52w,
-                'vol_surge':      vol_surge,
-            })
-
-        if not results:
+        codes = close_pivot.columns
+        vol_pivot = vol_pivot.reindex(columns=codes)
+
+        def tail_stats(pivot):
+            """종목별 유효값 수와, 최근 n개 유효값(= dropna().tail(n))만 남기는 함수"""
+            valid = pivot.notna()
+            # 각 날짜부터 마지막 날짜까지의 유효값 개수 (역방향 누적합)
+            rank_from_end = valid[::-1].cumsum()[::-1]
+            return valid.sum(), lambda n: pivot.where(valid & (rank_from_end <= n))
+
+        n_prices, close_tail = tail_stats(close_pivot)
+        n_vols, vol_tail = tail_stats(vol_pivot)
+
+        def ret_pct(p_past):
+            if p_past is None:
+                return pd.Series(float('nan'), index=codes)
+            v = p_past.where(p_past > 0)
+            return (price_now - v) / v * 100
+
+        returns = pd.DataFrame({'1m': ret_pct(price_1m), '3m': ret_pct(price_3m), '6m': ret_pct(price_6m)})
+        rs = returns - pd.Series({'1m': k_1m, '3m': k_3m, '6m': k_6m})
+
+        # 복합 RS: 1M 40% + 3M 35% + 6M 25% (값이 있는 기간의 가중치로 정규화)
+        weights = pd.Series({'1m': 0.40, '3m': 0.35, '6m': 0.25})
+        rs_composite = rs.mul(weights).sum(axis=1, min_count=1) / rs.notna().mul(weights).sum(axis=1)
+
+        # 이평선 정배열
+        ma20 = close_tail(20).mean().where(n_prices >= 20)
+        ma60 = close_tail(60).mean().where(n_prices >= 60)
+        ma120 = close_tail(120).mean().where(n_prices >= 120)
+        ma_aligned = (price_now > ma20) & (ma20 > ma60) & (ma60 > ma120)
+
+        # 52주 신고가 근접도
+        high_52w = close_tail(252).max()
+        proximity_52w = (price_now / high_52w * 100).where(high_52w > 0).round(1)
+
+        # 거래량 급증비
+        avg20 = vol_tail(20).mean()
+        avg60 = vol_tail(60).mean()
+        vol_surge = (avg20 / avg60).where((n_vols >= 60) & (avg60 > 0)).round(2)
+
+        eligible = (n_prices >= 30) & (price_now > 0) & rs_composite.notna()
+        if not eligible.any():
             logging.warning("스크리닝 결과가 없습니다.")
             return None
 
-        result_df = pd.DataFrame(results)
+        result_df = pd.DataFrame({
+            'code':           codes,
+            'name':           codes.map(lambda code: name_map.get(code, code)),
+            'current_price':  price_now.round(),
+            'ret_1m':         returns['1m'].round(2),
+            'ret_3m':         returns['3m'].round(2),
+            'ret_6m':         returns['6m'].round(2),
+            'rs_1m':          rs['1m'].round(2),
+            'rs_3m':          rs['3m'].round(2),
+            'rs_6m':          rs['6m'].round(2),
+            'rs_composite':   rs_composite.round(2),
+            'ma_aligned':     ma_aligned,
+            'proximity_52w':  proximity_52w,
+            'vol_surge':      vol_surge,
+        }, index=codes)[eligible].reset_index(drop=True)
+        result_df['current_price'] = result_df['current_price'].astype('int64')
 
         # RS Rating: 전체 종목 대비 백분위 (1~100)
         result_df['rs_rating'] = result_df['rs_composite'].rank(pct=True).mul(100).round(1)
@@ -220,7 +205,9 @@ class Screener:
                 cols.insert(2, cols.pop(cols.index(key)))
         result_df = result_df[cols]
 
-        # 6. Excel 저장
+        # 6. Excel 저장 (openpyxl은 여기서만 사용하므로 지연 import)
+        from openpyxl.styles import PatternFill, Font
+        from openpyxl.utils import get_column_letter
         os.makedirs('reports', exist_ok=True)
         filename = os.path.join('reports', f'leading_stocks_{date_str}.xlsx')
         with pd.ExcelWriter(filename, engine='openpyxl') as writer:
@@ -231,23 +218,25 @@ class Screener:
             green_fill  = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
             bold_font   = Font(bold=True)
 
-            for row_num in range(2, ws.max_row + 1):
+            ma_idx = col_map['ma_aligned'] - 1 if 'ma_aligned' in col_map else None
+            rs_idx = col_map['rs_rating'] - 1 if 'rs_rating' in col_map else None
+
+            # 데이터 행을 한 번만 순회 (ws.cell() 조회 반복 없이 행의 셀 튜플을 인덱싱)
+            for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
                 # 이평선 정배열 → 초록 배경
-                if 'ma_aligned' in col_map:
-                    if ws.cell(row=row_num, column=col_map['ma_aligned']).value is True:
-                        for col_num in range(1, ws.max_column + 1):
-                            ws.cell(row=row_num, column=col_map['ma_aligned']).fill = green_fill
+                if ma_idx is not None and row[ma_idx].value is True:
+                    row[ma_idx].fill = green_fill
                 # RS Rating 90 이상 → bold
-                if 'rs_rating' in col_map:
-                    cell = ws.cell(row=row_num, column=col_map['rs_rating'])
-                    if cell.value and float(cell.value) >= 90:
-                        for col_num in range(1, ws.max_column + 1):
-                            ws.cell(row=row_num, column=col_num).font = bold_font
+                if rs_idx is not None:
+                    value = row[rs_idx].value
+                    if value and float(value) >= 90:
+                        for cell in row:
+                            cell.font = bold_font
 
-            # 컬럼 너비 자동 조정
-            for col_cells in ws.columns:
-                max_len = max((len(str(c.value)) for c in col_cells if c.value is not None), default=8)
-                ws.column_dimensions[col_cells[0].column_letter].width = max_len + 2
+            # 컬럼 너비 자동 조정 (시트 셀 대신 DataFrame에서 컬럼별 최대 문자열 길이를 계산)
+            value_lengths = result_df.astype(str).where(result_df.notna()).apply(lambda col: col.str.len()).max().fillna(0)
+            for col, idx in col_map.items():
+                ws.column_dimensions[get_column_letter(idx)].width = max(len(str(col)), int(value_lengths[col])) + 2
 
         logging.info(f"주도주 스크리닝 완료: {len(result_df)}개 종목 → '{filename}'")
         return result_df
@@ -285,8 +274,8 @@ class Screener:
             """
             
             logging.info(f"'{code}' 종목의 최근 {months}개월 리스크 지표를 계산합니다.")
-            df = pd.read_sql(query, self.engine, params=(code, start_date_str))
-            return df
+            df = self.db_access.read_sql(query, params=(code, start_date_str))
+            return df if df is not None else pd.DataFrame()
 
         except Exception as e:
             logging.error(f"리스크 지표 계산 중 오류 발생: {e}")
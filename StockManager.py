@@ -1,20 +1,91 @@
 import os
+import hashlib
 import logging
 import time
 import datetime
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import re
-from decimal import Decimal
-from io import StringIO
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 import FinanceDataReader as fdr
 from AppManager import get_db_connection
 
+# FnGuide 숫자 셀 정리용 (천 단위 구분자, %, 공백 제거)
+_NUMERIC_CLEAN_RE = re.compile(r'[,%\s]')
+
+
+def _segment_risk_kernel(close, market, starts):
+    """종목 경계(starts)로 구분된 연속 종가 배열에서 종목별 (시세 수, 1일 최대 하락률, 베타)를 한 번에 계산
+
+    close/market은 (종목, 거래일) 순으로 정렬된 float64 배열(NaN = 데이터 없음),
+    starts는 각 종목 구간의 시작 인덱스(오름차순)입니다. 모든 집계는 reduceat으로 구간별 한 번씩만 수행합니다.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1일 수익률: 종목 첫 행은 이전 종목 종가와 이어지지 않도록 NaN 처리
+        prev = np.empty_like(close)
+        prev[0] = np.nan
+        prev[1:] = close[:-1]
+        prev[starts] = np.nan
+        ret = close / prev - 1.0
+
+        n_prices = np.add.reduceat((~np.isnan(close)).astype(np.int64), starts)
+
+        # 1일 최대 하락률 (NaN은 무시), 하락이 없거나 데이터가 부족하면 0
+        max_fall = np.fmin.reduceat(ret * 100.0, starts)
+        max_fall = np.where(max_fall < 0, max_fall, 0.0)
+
+        # 베타 = Cov(종목, KOSPI) / Var(KOSPI), 두 수익률이 모두 있는 날만 사용 (ddof=1)
+        valid = ~(np.isnan(ret) | np.isnan(market))
+        x = np.where(valid, ret, 0.0)
+        y = np.where(valid, market, 0.0)
+        n = np.add.reduceat(valid.astype(np.int64), starts)
+        sx = np.add.reduceat(x, starts)
+        sy = np.add.reduceat(y, starts)
+        cov = (np.add.reduceat(x * y, starts) - sx * sy / n) / (n - 1)
+        market_var = (np.add.reduceat(y * y, starts) - sy * sy / n) / (n - 1)
+        beta = np.where((n >= 30) & (n_prices >= 30) & (market_var > 0), np.round(cov / market_var, 4), np.nan)
+
+    return n_prices, max_fall, beta
+
+
 class StockManager:
     """
     주식 종목 정보(기본정보, 재무제표)와 가격 정보(시세)를 통합 관리하는 클래스
     """
+    # LOAD DATA 한 번에 적재할 최대 시세 행 수
+    BULK_LOAD_ROWS = 100_000
+    # FnGuide 스크래핑에 필요한 요소 id/class (모두 파싱되면 응답 수신 중단)
+    FNGUIDE_TARGET_IDS = ('corp_group1', 'highlight_D_Y', 'svdMainGrid2')
+    FNGUIDE_TARGET_CLASSES = ('corp_group2',)
+    # FnGuide 종목 페이지 URL (gicode=A{종목코드})
+    FNGUIDE_URL_PREFIX = "https://comp.fnguide.com/SVO2/ASP/SVD_Main.asp?pGB=1&gicode=A"
+    FNGUIDE_URL_SUFFIX = "&cID=&MenuYn=Y&ReportGB=&NewMenuID=101&stkGb=701"
+    # Naver 일봉 차트 XML (FinanceDataReader의 KRX 시세 소스)
+    NAVER_CHART_URL = "https://fchart.stock.naver.com/sise.nhn"
+    # prices 적재용 multi-row INSERT 구문 (VALUES 뒤 행 목록은 DBAccessManager에서 생성)
+    PRICES_INSERT_CLAUSE = "INSERT INTO prices (company_id, trade_date, open_price, high_price, low_price, close_price, volume) VALUES"
+    PRICES_UPSERT_SUFFIX = (
+        "ON DUPLICATE KEY UPDATE open_price = VALUES(open_price), high_price = VALUES(high_price), "
+        "low_price = VALUES(low_price), close_price = VALUES(close_price), volume = VALUES(volume)"
+    )
+    # save_daily_prices 증분 시세를 모아서 저장/커밋하는 행 수
+    PRICE_FLUSH_ROWS = 10_000
+    # KRX 정규장 종가가 확정된 것으로 보는 시각 (15:30 장 마감 + 여유) — 이전에는 전체 시세 스냅샷을 쓰지 않음
+    KRX_SNAPSHOT_AFTER = datetime.time(16, 0)
+    # save_stock_info executemany 청크 크기
+    UPSERT_CHUNK_ROWS = 1000
+    # daily_financials INSERT 컬럼 순서에 대응하는 DataFrame 컬럼 (company_id, code, date 제외)
+    FINANCIAL_COLUMNS = [
+        'Marcap', 'Stocks', 'PBR', 'PER', 'IndustPER', 'EPS', 'ROE', 'DivRate', 'BPS',
+        'PER_pred', 'PBR_pred', 'EPS_pred', 'ROE_pred', 'BPS_pred', 'perf_yoy', 'perf_vs_3m_ago'
+    ]
+
     def __init__(self, db_access):
         """
         StockManager 생성자
@@ -22,11 +93,40 @@ class StockManager:
             db_access (dbaccess): 데이터베이스 접근 객체
         """
         self.db_access = db_access
+        # 시세 수집이 연속 N회 실패한 종목(상장폐지 등)은 쿨다운 기간(일) 동안 요청하지 않음
+        self.PRICE_FETCH_MAX_FAILURES = int(os.getenv('PRICE_FETCH_MAX_FAILURES', '3'))
+        self.PRICE_FETCH_COOLDOWN_DAYS = int(os.getenv('PRICE_FETCH_COOLDOWN_DAYS', '7'))
+        # 시세(DataReader) 동시 조회 스레드 수
+        self.PRICE_FETCH_WORKERS = int(os.getenv('PRICE_FETCH_WORKERS', '8'))
+        # FnGuide 동시 요청 스레드 수
+        self.FNGUIDE_WORKERS = int(os.getenv('FNGUIDE_WORKERS', '16'))
+        self._http_session = None
+        # 스레드 풀 작업자들이 동시에 처음 호출해도 Session은 하나만 생성
+        self._http_session_lock = threading.Lock()
+        # save_stock_info에서 받은 KRX 종목 목록(당일 시세 포함)을 시세 저장 시 재사용
+        self._krx_listing = None
+        self._krx_listing_at = None  # _krx_listing을 받은 시각 (당일 종가 포함 여부 확인용)
+        # 시세 대상 종목 목록 캐시 (save_stock_info/시세 수집 실패 기록 시 무효화)
+        self._companies_cache = None
+        # 종목코드 → companies.id 매핑 캐시 (save_stock_info에서 종목 저장 시 무효화)
+        self._company_id_cache = None
+        # FnGuide 응답 디스크 캐시 (같은 URL은 TTL(초) 동안 재요청하지 않음, 0이면 비활성화)
+        self.FNGUIDE_CACHE_DIR = os.getenv('FNGUIDE_CACHE_DIR', os.path.join('cache', 'fnguide'))
+        self.FNGUIDE_CACHE_TTL = int(os.getenv('FNGUIDE_CACHE_TTL', '21600'))
+        # '0' 접미사 코드로 재시도해서 성공한 종목의 코드 매핑 (다음 호출 시 첫 요청 생략)
+        self._fnguide_code_alias = {}
 
     def create_tables(self):
         """주식 관련 테이블(companies, daily_financials, prices, etf_prices)을 생성"""
-        if self._create_companies_table() and self._create_daily_financials_table() and self._create_prices_table() and self._create_etf_prices_table():
+        if (self._create_companies_table() and self._create_daily_financials_table() and self._create_prices_table()
+                and self._create_etf_prices_table()):
             self._ensure_beta_column()
+            self._ensure_prices_covering_index()
+            self._ensure_price_fetch_columns()
+            self._ensure_fnguide_code_column()
+            self._ensure_daily_financials_company_id()
+            self._ensure_is_primary_column()
+            self._ensure_daily_financials_date_index()
             return True
         return False
 
@@ -46,6 +146,169 @@ class StockManager:
         except Exception as e:
             logging.error(f"beta 컬럼 확인/추가 중 오류: {e}")
 
+    def _ensure_prices_covering_index(self):
+        """기존 prices 테이블에 (company_id, trade_date, close_price) 커버링 인덱스가 없으면 추가합니다 (마이그레이션).
+        리스크 지표/최신가 조회가 테이블 행을 읽지 않고 인덱스만으로 처리됩니다."""
+        try:
+            check_query = """
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'prices' AND INDEX_NAME = 'idx_cov'
+            """
+            result = self.db_access.fetch_one(check_query)
+            if result and result[0] == 0:
+                self.db_access.execute_query(
+                    "ALTER TABLE prices ADD INDEX idx_cov (company_id, trade_date, close_price)"
+                )
+                logging.info("'prices' 테이블에 'idx_cov' 커버링 인덱스를 추가했습니다.")
+        except Exception as e:
+            logging.error(f"prices 커버링 인덱스 확인/추가 중 오류: {e}")
+
+    def _ensure_price_fetch_columns(self):
+        """기존 companies 테이블에 시세 수집 실패 이력 컬럼이 없으면 추가합니다 (마이그레이션)."""
+        try:
+            check_query = """
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'companies' AND COLUMN_NAME = 'price_fetch_failures'
+            """
+            result = self.db_access.fetch_one(check_query)
+            if result and result[0] == 0:
+                self.db_access.execute_query(
+                    "ALTER TABLE companies "
+                    "ADD COLUMN price_fetch_failures INT NOT NULL DEFAULT 0 COMMENT '시세 수집 연속 실패 횟수', "
+                    "ADD COLUMN price_fetch_failed_at DATE COMMENT '마지막 시세 수집 실패일'"
+                )
+                logging.info("'companies' 테이블에 시세 수집 실패 이력 컬럼을 추가했습니다.")
+        except Exception as e:
+            logging.error(f"시세 수집 실패 이력 컬럼 확인/추가 중 오류: {e}")
+
+    def _ensure_fnguide_code_column(self):
+        """기존 companies 테이블에 fnguide_code 컬럼이 없으면 추가합니다 (마이그레이션)."""
+        try:
+            check_query = """
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'companies' AND COLUMN_NAME = 'fnguide_code'
+            """
+            result = self.db_access.fetch_one(check_query)
+            if result and result[0] == 0:
+                self.db_access.execute_query(
+                    "ALTER TABLE companies ADD COLUMN fnguide_code VARCHAR(20) COMMENT 'FnGuide 조회용 대체 종목코드'"
+                )
+                logging.info("'companies' 테이블에 'fnguide_code' 컬럼을 추가했습니다.")
+        except Exception as e:
+            logging.error(f"fnguide_code 컬럼 확인/추가 중 오류: {e}")
+
+    def _ensure_daily_financials_date_index(self):
+        """기존 daily_financials 테이블에 (date, code, company_id) 인덱스가 없으면 추가합니다 (마이그레이션).
+        날짜 조건으로 대상 종목을 찾는 조회(당일 저장 종목, 리스크 지표 대상)가 인덱스 범위 스캔만으로 처리됩니다."""
+        try:
+            check_query = """
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'daily_financials' AND INDEX_NAME = 'idx_date_code'
+            """
+            result = self.db_access.fetch_one(check_query)
+            if result and result[0] == 0:
+                self.db_access.execute_query(
+                    "ALTER TABLE daily_financials ADD INDEX idx_date_code (date, code, company_id)"
+                )
+                logging.info("'daily_financials' 테이블에 'idx_date_code' 인덱스를 추가했습니다.")
+        except Exception as e:
+            logging.error(f"daily_financials 날짜 인덱스 확인/추가 중 오류: {e}")
+
+    def migrate_perf_columns_to_decimal(self):
+        """daily_financials의 실적이슈 컬럼(perf_yoy, perf_vs_3m_ago)이 문자열이면 DECIMAL로 바꾸는 1회성 마이그레이션.
+
+        create_tables()에서 자동으로 실행하지 않으며, 명시적으로 호출해야 합니다 (main.py: MIGRATE_PERF_NUMERIC=1).
+        기존 컬럼은 그대로 둔 채 새 DECIMAL 컬럼(*_num)에 변환 값을 채우고, 모두 성공한 뒤에만
+        한 번의 ALTER로 이름을 맞바꿉니다. 원래 문자열 값은 *_text 컬럼으로 남습니다 (확인 후 직접 삭제).
+        숫자로 해석할 수 없거나 DECIMAL(10, 4) 범위를 벗어나는 값만 새 컬럼에서 NULL이 됩니다.
+
+        Returns:
+            bool: 변환이 필요 없거나 완료되면 True, 실패하면 False (기존 컬럼은 변경되지 않음)
+        """
+        columns = ('perf_yoy', 'perf_vs_3m_ago')
+        comments = {'perf_yoy': '실적이슈(전년동기대비, %)', 'perf_vs_3m_ago': '실적이슈(3개월전대비, %)'}
+        try:
+            type_query = """
+            SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'daily_financials'
+              AND COLUMN_NAME IN ('perf_yoy', 'perf_vs_3m_ago', 'perf_yoy_num', 'perf_vs_3m_ago_num')
+            """
+            rows = self.db_access.fetch_all(type_query)
+            if rows is None:
+                return False
+            data_types = dict(rows)
+            if all(data_types.get(col) == 'decimal' for col in columns):
+                logging.info("daily_financials 실적이슈 컬럼은 이미 DECIMAL입니다.")
+                return True
+
+            # 1. 새 DECIMAL 컬럼 추가 (이전 실행에서 이미 추가되었으면 재사용)
+            missing = [f"ADD COLUMN {col}_num DECIMAL(10, 4)" for col in columns if f"{col}_num" not in data_types]
+            if missing and not self.db_access.execute_query(f"ALTER TABLE daily_financials {', '.join(missing)}"):
+                return False
+
+            # 2. 콤마/퍼센트를 제거한 값이 숫자(지수 표기, '12.' 포함)이고 범위 안이면 새 컬럼에 기록
+            numeric_pattern = '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$'
+            assignments = []
+            for col in columns:
+                cleaned = f"TRIM(REPLACE(REPLACE({col}, ',', ''), '%', ''))"
+                # CASE로 숫자 형식인 값만 변환 (strict 모드에서 문자열 → 숫자 변환 경고가 오류가 되지 않도록)
+                assignments.append(
+                    f"{col}_num = CASE WHEN {cleaned} REGEXP '{numeric_pattern}' "
+                    f"THEN IF(ABS({cleaned} + 0) < 1000000, CAST({cleaned} + 0 AS DECIMAL(10, 4)), NULL) END"
+                )
+            if not self.db_access.execute_query(f"UPDATE daily_financials SET {', '.join(assignments)}"):
+                return False
+
+            # 3. 변환이 끝난 뒤 한 번의 ALTER로 컬럼 이름 교체 (기존 문자열 컬럼은 *_text로 보존)
+            swaps = []
+            for col in columns:
+                swaps.append(f"CHANGE COLUMN {col} {col}_text VARCHAR(50) COMMENT '{comments[col]} 변환 전 원문'")
+                swaps.append(f"CHANGE COLUMN {col}_num {col} DECIMAL(10, 4) COMMENT '{comments[col]}'")
+            if not self.db_access.execute_query(f"ALTER TABLE daily_financials {', '.join(swaps)}"):
+                return False
+            logging.info("daily_financials 실적이슈 컬럼을 DECIMAL로 변환했습니다. 원래 값은 *_text 컬럼에 남아 있습니다.")
+            return True
+        except Exception as e:
+            logging.error(f"실적이슈 컬럼 DECIMAL 변환 중 오류: {e}")
+            return False
+
+    def _ensure_is_primary_column(self):
+        """기존 companies 테이블에 보통주 여부(is_primary) 생성 컬럼과 인덱스가 없으면 추가합니다 (마이그레이션)."""
+        try:
+            check_query = """
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'companies' AND COLUMN_NAME = 'is_primary'
+            """
+            result = self.db_access.fetch_one(check_query)
+            if result and result[0] == 0:
+                self.db_access.execute_query(
+                    "ALTER TABLE companies "
+                    "ADD COLUMN is_primary TINYINT(1) AS (RIGHT(code, 1) = '0') STORED COMMENT '보통주 여부 (종목코드 끝자리 0)', "
+                    "ADD INDEX idx_is_primary (is_primary)"
+                )
+                logging.info("'companies' 테이블에 'is_primary' 컬럼을 추가했습니다.")
+        except Exception as e:
+            logging.error(f"is_primary 컬럼 확인/추가 중 오류: {e}")
+
+    def _ensure_daily_financials_company_id(self):
+        """기존 daily_financials 테이블에 company_id 컬럼이 없으면 추가하고 기존 행을 채웁니다 (마이그레이션)."""
+        try:
+            check_query = """
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'daily_financials' AND COLUMN_NAME = 'company_id'
+            """
+            result = self.db_access.fetch_one(check_query)
+            if result and result[0] == 0:
+                self.db_access.execute_query(
+                    "ALTER TABLE daily_financials ADD COLUMN company_id INT COMMENT 'companies.id (prices 조인용)'"
+                )
+                self.db_access.execute_query(
+                    "UPDATE daily_financials df JOIN companies c ON c.code = df.code SET df.company_id = c.id"
+                )
+                logging.info("'daily_financials' 테이블에 'company_id' 컬럼을 추가했습니다.")
+        except Exception as e:
+            logging.error(f"daily_financials.company_id 컬럼 확인/추가 중 오류: {e}")
+
     def _create_companies_table(self):
         """'companies' 테이블 생성"""
         try:
@@ -55,7 +318,12 @@ class StockManager:
                 code VARCHAR(20) NOT NULL UNIQUE COMMENT '종목코드',
                 name VARCHAR(255) NOT NULL COMMENT '종목명',
                 market VARCHAR(50) COMMENT '시장',
-                url VARCHAR(255) COMMENT 'FnGuide URL'
+                url VARCHAR(255) COMMENT 'FnGuide URL',
+                price_fetch_failures INT NOT NULL DEFAULT 0 COMMENT '시세 수집 연속 실패 횟수',
+                price_fetch_failed_at DATE COMMENT '마지막 시세 수집 실패일',
+                fnguide_code VARCHAR(20) COMMENT 'FnGuide 조회용 대체 종목코드',
+                is_primary TINYINT(1) AS (RIGHT(code, 1) = '0') STORED COMMENT '보통주 여부 (종목코드 끝자리 0)',
+                KEY idx_is_primary (is_primary)
             ) COMMENT '종목 기본 정보';
             """
             self.db_access.execute_query(query)
@@ -87,12 +355,14 @@ class StockManager:
                 eps_pred DECIMAL(15, 2) COMMENT 'EPS(예상)',
                 roe_pred DECIMAL(10, 2) COMMENT 'ROE(예상)',
                 bps_pred DECIMAL(15, 2) COMMENT 'BPS(예상)',
-                perf_yoy VARCHAR(50) COMMENT '실적이슈(전년동기대비)',
-                perf_vs_3m_ago VARCHAR(50) COMMENT '실적이슈(3개월전대비)',
+                perf_yoy DECIMAL(10, 4) COMMENT '실적이슈(전년동기대비, %)',
+                perf_vs_3m_ago DECIMAL(10, 4) COMMENT '실적이슈(3개월전대비, %)',
                 max_daily_fall_rate DECIMAL(10, 2) COMMENT '1일 최대 하락률',
                 beta DECIMAL(10, 4) COMMENT '베타 (KOSPI 대비 1년 일별 수익률)',
+                company_id INT COMMENT 'companies.id (prices 조인용)',
                 FOREIGN KEY (code) REFERENCES companies (code) ON DELETE CASCADE,
-                UNIQUE KEY (code, date)
+                UNIQUE KEY (code, date),
+                KEY idx_date_code (date, code, company_id)
             ) COMMENT '일일 재무 정보';
             """
             self.db_access.execute_query(query)
@@ -116,7 +386,8 @@ class StockManager:
                 close_price DECIMAL(15, 2) NULL,
                 volume BIGINT,
                 FOREIGN KEY (company_id) REFERENCES companies(id),
-                UNIQUE KEY (company_id, trade_date)
+                UNIQUE KEY idx_company_date (company_id, trade_date),
+                KEY idx_cov (company_id, trade_date, close_price)
             )
             """
             self.db_access.execute_query(query)
@@ -150,14 +421,23 @@ class StockManager:
             logging.error(f"Error creating 'etf_prices' table: {e}")
             return False
 
-    def save_stock_info(self, limit=None):
-        """FinanceDataReader와 FnGuide를 사용하여 종목 정보를 가져와 DB에 저장"""
+    def save_stock_info(self, limit=None, force=None):
+        """FinanceDataReader와 FnGuide를 사용하여 종목 정보를 가져와 DB에 저장
+
+        같은 날 이미 daily_financials에 저장된 종목은 FnGuide 스크래핑을 건너뜁니다.
+        force=True(또는 환경변수 FORCE_RESCAN=1)이면 모든 종목을 다시 수집합니다.
+        limit은 위 건너뛰기와 FDR 기준 PER/EPS 필터를 적용한 뒤 스크래핑할 시가총액 상위 종목 수입니다.
+        """
+        if force is None:
+            force = os.getenv('FORCE_RESCAN') == '1'
         stocks = None
         try:
             logging.info("FinanceDataReader에서 전체 종목 목록을 가져옵니다...")
             try:
                 # KRX 전체(KOSPI, KOSDAQ, KONEX) 목록을 한번에 가져온 후 필터링
                 krx_list = fdr.StockListing('KRX')
+                self._krx_listing = krx_list
+                self._krx_listing_at = datetime.datetime.now()
                 
                 # KOSPI와 KOSDAQ 종목만 필터링
                 stocks = krx_list[krx_list['Market'].isin(['KOSPI', 'KOSDAQ'])].copy()
@@ -222,131 +502,466 @@ class StockManager:
                 logging.error("종목 정보를 가져오지 못했습니다. 작업을 중단합니다.")
                 return
                 
-            # 설정된 개수만큼만 자르기 (상위 종목만 검토하여 불필요한 스크래핑 방지)
-            if limit:
-                stocks = stocks.head(limit)
-            
             today_date = datetime.date.today()
-            companies_to_upsert = []
-            financials_to_insert = []
+
+            # 오늘 이미 저장된 종목 (같은 날 재실행 시 스크래핑 생략)
+            if not force:
+                saved_rows = self.db_access.fetch_all("SELECT code FROM daily_financials WHERE date = %s", (today_date,))
+                saved_today = {r[0] for r in saved_rows} if saved_rows else set()
+                if saved_today:
+                    logging.info(f"오늘 이미 저장된 {len(saved_today)}개 종목은 스크래핑을 건너뜁니다. (FORCE_RESCAN=1로 강제 재수집)")
+                    stocks = stocks[~stocks['Code'].isin(saved_today)]
             
+            # 스크래핑 전 1차 필터: FDR 값으로 이미 조건(PER > 0, EPS >= 0)을 벗어나는 종목은 요청하지 않음
+            # (값이 없는 NaN은 FnGuide에서 채워질 수 있으므로 통과)
+            pre_count = len(stocks)
+            for column, is_eligible in (('PER', lambda v: v > 0), ('EPS', lambda v: v >= 0)):
+                if column in stocks.columns:
+                    values = pd.to_numeric(stocks[column], errors='coerce')
+                    stocks = stocks[values.isna() | is_eligible(values)]
+            if len(stocks) < pre_count:
+                logging.info(f"FDR 기준 조건 미달 {pre_count - len(stocks)}개 종목은 스크래핑을 건너뜁니다.")
+
+            # 설정된 개수만큼만 자르기 (위 필터를 통과한 시가총액 상위 종목만 스크래핑)
+            if limit:
+                stocks = stocks.head(limit)
+
             logging.info("조건에 맞는 종목을 필터링하고 DB에 저장할 데이터를 준비합니다...")
-            for _, row in stocks.iterrows():
-                # 상세 재무 정보 스크레이핑
-                fnguide_financials = self.get_financial_data_from_fnguide(row.get('Code'))
-                
-                # FDR 데이터와 스크래핑 데이터 병합
+            # 상세 재무 정보 스크레이핑 (스레드 풀로 동시 요청, 파싱 결과 dict만 수집)
+            # 이전 실행에서 '0' 접미사 코드로 재시도해 성공한 종목은 저장된 코드로 바로 조회
+            fnguide_code_rows = self.db_access.fetch_all("SELECT code, fnguide_code FROM companies WHERE fnguide_code IS NOT NULL")
+            stored_fnguide_codes = dict(fnguide_code_rows) if fnguide_code_rows else {}
+            fnguide_by_code = {}
+            for code, fnguide_financials in self._scrape_fnguide(stocks['Code'], stored_fnguide_codes):
                 if fnguide_financials:
-                    for key, fnguide_val in fnguide_financials.items():
-                        if pd.notna(fnguide_val):
-                            row[key] = fnguide_val
-                
-                # 조건 필터링: PER > 0 이고, EPS >= 0 인 종목만 선택
-                per_value = row.get('PER')
-                eps_value = row.get('EPS')
-
-                if per_value is not None and pd.notna(per_value) and per_value > 0 and eps_value is not None and pd.notna(eps_value) and eps_value >= 0:
-                    # companies 테이블 데이터
-                    fnguide_url = f"https://comp.fnguide.com/SVO2/ASP/SVD_Main.asp?pGB=1&gicode=A{row.get('Code')}&cID=&MenuYn=Y&ReportGB=&NewMenuID=101&stkGb=701"
-                    companies_to_upsert.append((
-                        row.get('Code'), row.get('Name'), row.get('Market'), fnguide_url
-                    ))
-                    
-                    # daily_financials 테이블 데이터
-                    financials_to_insert.append((
-                        row.get('Code'), today_date, row.get('Marcap'), row.get('Stocks'),
-                        row.get('PBR'), row.get('PER'), row.get('IndustPER'), row.get('EPS'),
-                        row.get('ROE'), row.get('DivRate'), row.get('BPS'),
-                        row.get('PER_pred'), row.get('PBR_pred'), row.get('EPS_pred'),
-                        row.get('ROE_pred'), row.get('BPS_pred'),
-                        row.get('perf_yoy'), row.get('perf_vs_3m_ago')
-                    ))
-                
-                if limit and len(companies_to_upsert) >= limit:
-                    logging.info(f"조건을 만족하는 {limit}개의 종목을 찾았습니다. 목록 수집을 중단합니다.")
-                    break
+                    fnguide_by_code[code] = fnguide_financials
+            logging.info(f"FnGuide에서 {len(fnguide_by_code)}/{len(stocks)}개 종목의 재무 정보를 가져왔습니다.")
+
+            # FDR 데이터와 스크래핑 데이터 병합 (스크래핑 값이 NaN이 아니면 우선 적용, 시가총액 순서 유지)
+            merged_df = stocks.set_index('Code', drop=False)
+            if fnguide_by_code:
+                fnguide_df = pd.DataFrame.from_dict(fnguide_by_code, orient='index')
+                merged_df = fnguide_df.combine_first(merged_df).reindex(merged_df.index)
+            merged_df = merged_df.reindex(columns=['Code', 'Name', 'Market'] + self.FINANCIAL_COLUMNS)
+
+            # 조건 필터링: PER > 0 이고, EPS >= 0 인 종목만 선택
+            per_values = pd.to_numeric(merged_df['PER'], errors='coerce')
+            eps_values = pd.to_numeric(merged_df['EPS'], errors='coerce')
+            merged_df = merged_df[(per_values > 0) & (eps_values >= 0)].copy()
+            logging.info(f"조건을 만족하는 종목 {len(merged_df)}개를 찾았습니다.")
+
+            merged_df['url'] = self.FNGUIDE_URL_PREFIX + merged_df['Code'] + self.FNGUIDE_URL_SUFFIX
+            merged_df['date'] = today_date
+            # 실적이슈는 수집 시 한 번만 숫자로 변환해 DECIMAL(10, 4) 컬럼에 저장
+            # (숫자가 아니거나 범위를 벗어난 값은 NULL — strict 모드에서 한 행 때문에 트랜잭션 전체가 롤백되지 않도록)
+            for col in ('perf_yoy', 'perf_vs_3m_ago'):
+                parsed = pd.to_numeric(
+                    merged_df[col].astype(str).str.replace(r'[,%]', '', regex=True).str.strip(), errors='coerce'
+                ).where(lambda values: values.abs() < 1e6)
+                dropped = int((merged_df[col].notna() & parsed.isna()).sum())
+                if dropped:
+                    logging.warning(f"{col}: 숫자로 변환할 수 없거나 범위를 벗어난 값 {dropped}개는 NULL로 저장합니다.")
+                merged_df[col] = parsed
+            # NaN은 DB NULL(None)로, numpy 스칼라는 파이썬 기본 타입으로 변환
+            merged_df = merged_df.astype(object).where(merged_df.notna(), None)
+
+            # companies 테이블 데이터 (daily_financials 행은 companies 저장 후 company_id를 채워 생성)
+            companies_to_upsert = list(merged_df[['Code', 'Name', 'Market', 'url']].itertuples(index=False, name=None))
+            financials_to_insert = []
 
             # DB 저장 로직
-            if companies_to_upsert:
-                query_companies = """
-                INSERT INTO companies (code, name, market, url) 
-                VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    name = VALUES(name), market = VALUES(market), url = VALUES(url);
-                """
-                self.db_access.execute_many_query(query_companies, companies_to_upsert)
-                logging.info(f"성공적으로 {len(companies_to_upsert)}개 종목 기본 정보를 저장/업데이트했습니다.")
-
-            if financials_to_insert:
-                query_financials = """
-                INSERT INTO daily_financials (
-                    code, date, marcap, stocks, pbr, per, indust_per, eps, roe, div_yield, bps, 
-                    per_pred, pbr_pred, eps_pred, roe_pred, bps_pred,
-                    perf_yoy, perf_vs_3m_ago
-                ) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    marcap = VALUES(marcap), stocks = VALUES(stocks), pbr = VALUES(pbr), per = VALUES(per),
-                    indust_per = VALUES(indust_per), eps = VALUES(eps), roe = VALUES(roe), div_yield = VALUES(div_yield),
-                    bps = VALUES(bps), per_pred = VALUES(per_pred), pbr_pred = VALUES(pbr_pred),
-                    eps_pred = VALUES(eps_pred), roe_pred = VALUES(roe_pred), bps_pred = VALUES(bps_pred),
-                    perf_yoy = VALUES(perf_yoy), perf_vs_3m_ago = VALUES(perf_vs_3m_ago);
-                """
-                self.db_access.execute_many_query(query_financials, financials_to_insert)
-                logging.info(f"성공적으로 {len(financials_to_insert)}개 종목의 일일 재무 정보를 저장했습니다.")
+            query_companies = """
+            INSERT INTO companies (code, name, market, url) 
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                name = VALUES(name), market = VALUES(market), url = VALUES(url);
+            """
+            query_financials = """
+            INSERT INTO daily_financials (
+                company_id, code, date, marcap, stocks, pbr, per, indust_per, eps, roe, div_yield, bps, 
+                per_pred, pbr_pred, eps_pred, roe_pred, bps_pred,
+                perf_yoy, perf_vs_3m_ago
+            ) 
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                company_id = VALUES(company_id), marcap = VALUES(marcap), stocks = VALUES(stocks), pbr = VALUES(pbr), per = VALUES(per),
+                indust_per = VALUES(indust_per), eps = VALUES(eps), roe = VALUES(roe), div_yield = VALUES(div_yield),
+                bps = VALUES(bps), per_pred = VALUES(per_pred), pbr_pred = VALUES(pbr_pred),
+                eps_pred = VALUES(eps_pred), roe_pred = VALUES(roe_pred), bps_pred = VALUES(bps_pred),
+                perf_yoy = VALUES(perf_yoy), perf_vs_3m_ago = VALUES(perf_vs_3m_ago);
+            """
+            # 두 테이블 저장을 하나의 트랜잭션으로 처리 (max_allowed_packet 초과 방지를 위해 청크 단위 executemany)
+            saved = True
+            for i in range(0, len(companies_to_upsert), self.UPSERT_CHUNK_ROWS):
+                if self.db_access.execute_many_query(query_companies, companies_to_upsert[i:i + self.UPSERT_CHUNK_ROWS], commit=False) is None:
+                    saved = False
+                    break
+            if saved:
+                # 같은 트랜잭션 안에서 방금 저장한 종목까지 포함한 코드 → id 매핑으로 company_id를 직접 기록
+                self._company_id_cache = None
+                company_ids = self._get_company_ids()
+                company_id_values = merged_df['Code'].map(company_ids)
+                merged_df['company_id'] = company_id_values.astype(object).where(company_id_values.notna(), None)
+                financials_to_insert = list(merged_df[['company_id', 'Code', 'date'] + self.FINANCIAL_COLUMNS].itertuples(index=False, name=None))
+                for i in range(0, len(financials_to_insert), self.UPSERT_CHUNK_ROWS):
+                    if self.db_access.execute_many_query(query_financials, financials_to_insert[i:i + self.UPSERT_CHUNK_ROWS], commit=False) is None:
+                        saved = False
+                        break
+
+            if saved:
+                self.db_access.commit()
+                self._companies_cache = None
+                # 이번 실행에서 새로 확인된 FnGuide 대체 코드 저장
+                new_fnguide_codes = [(alias, code) for code, alias in self._fnguide_code_alias.items() if stored_fnguide_codes.get(code) != alias]
+                if new_fnguide_codes:
+                    self.db_access.execute_many_query("UPDATE companies SET fnguide_code = %s WHERE code = %s", new_fnguide_codes)
+                if companies_to_upsert:
+                    logging.info(f"성공적으로 {len(companies_to_upsert)}개 종목 기본 정보를 저장/업데이트했습니다.")
+                    logging.info(f"성공적으로 {len(financials_to_insert)}개 종목의 일일 재무 정보를 저장했습니다.")
+            else:
+                self.db_access.rollback()
+                self._company_id_cache = None
+                logging.error("종목 정보 저장 중 오류가 발생하여 트랜잭션을 롤백했습니다.")
 
         except Exception as e:
             logging.error(f"FDR 및 FnGuide에서 회사 정보를 저장하는 중 오류 발생: {e}")
+        finally:
+            self.close_http_session()
 
     def save_daily_prices(self, start_date=None, limit=None):
         """FinanceDataReader를 사용하여 종목의 일별 시세를 가져와 DB에 저장"""
         try:
             logging.info("일별 시세 저장을 시작합니다...")
             
-            # companies 테이블에서 종목 코드 가져오기 (ETF 제외)
-            query = "SELECT id, code FROM companies WHERE market != 'ETF'"
-            if limit:
-                query += f" LIMIT {limit}"
-            
-            companies = self.db_access.fetch_all(query)
+            # companies 테이블에서 종목 코드와 시세 수집 실패 이력 가져오기 (ETF 제외)
+            companies = self._get_companies(limit)
             if not companies:
                 logging.warning("시세를 저장할 종목이 없습니다.")
                 return
 
             logging.info(f"총 {len(companies)}개 종목의 시세를 업데이트합니다.")
 
+            today = datetime.date.today()
             if not start_date:
-                start_date = (datetime.date.today() - datetime.timedelta(days=365)).strftime('%Y-%m-%d')
+                start_date = (today - datetime.timedelta(days=365)).strftime('%Y-%m-%d')
 
-            for company_id, code in companies:
+            # 종목별 마지막 저장 날짜를 한 번에 조회
+            last_date_rows = self.db_access.fetch_all("SELECT company_id, MAX(trade_date) FROM prices GROUP BY company_id")
+            last_dates = dict(last_date_rows) if last_date_rows else {}
+
+            # 직전 거래일까지 저장된 종목은 최근 거래일 시세를 KRX 전체 시세 스냅샷에서 채움 (종목별 요청 생략)
+            prev_trading_day, latest_trading_day, snapshot = self._get_latest_krx_snapshot()
+
+            # 저장된 시세가 없는(신규 백필) 종목은 모아서 LOAD DATA로 적재
+            backfill_rows = []
+            # 증분 시세 행 버퍼 (여러 종목 합산)
+            pending_rows = []
+
+            # 1단계: 종목별 조회 구간 결정 (쿨다운 중이거나 조회할 영업일이 없는 종목은 제외)
+            jobs = []
+            for company_id, code, fetch_failures, fetch_failed_at in companies:
+                # 연속 수집 실패(상장폐지 등) 종목은 쿨다운 기간 동안 요청하지 않음
+                if (fetch_failures >= self.PRICE_FETCH_MAX_FAILURES and fetch_failed_at
+                        and (today - fetch_failed_at).days < self.PRICE_FETCH_COOLDOWN_DAYS):
+                    logging.info(f"[{code}] 시세 수집 {fetch_failures}회 연속 실패로 {fetch_failed_at} 이후 쿨다운 중 — 건너뜁니다.")
+                    continue
+
+                fetch_start_date = start_date
+                last_date = last_dates.get(company_id)
+                if last_date:
+                    fetch_start_date = (last_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+
+                # 조회 구간에 영업일이 없으면(이미 최신, 주말) 네트워크 요청 없이 건너뜀
+                fetch_start = datetime.datetime.strptime(fetch_start_date, '%Y-%m-%d').date()
+                if fetch_start > today or pd.bdate_range(fetch_start, today).empty:
+                    continue
+
+                snapshot_rows = None
+                if last_date and last_date == prev_trading_day and code in snapshot:
+                    snapshot_rows = [(company_id, latest_trading_day.strftime('%Y-%m-%d')) + snapshot[code]]
+                jobs.append((company_id, code, fetch_start_date, last_date, fetch_failures, snapshot_rows))
+
+            # 시세 수집 실패/복구 종목은 모아서 루프 종료 후 한 번에 갱신
+            failed_ids = []
+            recovered_ids = []
+
+            # 2단계: DataReader 호출은 스레드 풀에서 동시에, DB 쓰기는 현재 스레드 하나에서만 수행
+            for (company_id, code, _, last_date, fetch_failures, _), prices_to_insert, error in self._fetch_price_jobs(jobs):
                 try:
-                    # 마지막 저장된 날짜 확인
-                    last_date_query = "SELECT MAX(trade_date) FROM prices WHERE company_id = %s"
-                    last_date_row = self.db_access.fetch_one(last_date_query, (company_id,))
-                    
-                    fetch_start_date = start_date
-                    if last_date_row and last_date_row[0]:
-                        fetch_start_date = (last_date_row[0] + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-                    
-                    if fetch_start_date > datetime.date.today().strftime('%Y-%m-%d'):
+                    if error is not None:
+                        logging.error(f"[{code}] 시세 조회 실패: {error}")
+                        failed_ids.append(company_id)
                         continue
 
-                    df = fdr.DataReader(code, start=fetch_start_date)
-                    
-                    if df is None or df.empty:
-                        continue
-                    
-                    prices_to_insert = [(company_id, date.strftime('%Y-%m-%d'), float(row['Open']), float(row['High']), float(row['Low']), float(row['Close']), int(row['Volume'])) for date, row in df.iterrows()]
-                    
-                    if prices_to_insert:
-                        query = "INSERT INTO prices (company_id, trade_date, open_price, high_price, low_price, close_price, volume) VALUES (%s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE open_price = VALUES(open_price), high_price = VALUES(high_price), low_price = VALUES(low_price), close_price = VALUES(close_price), volume = VALUES(volume)"
-                        self.db_access.execute_many_query(query, prices_to_insert)
-                        logging.info(f"[{code}] {len(prices_to_insert)}일치 시세 저장 완료.")
+                    if fetch_failures:
+                        recovered_ids.append(company_id)
+
+                    if prices_to_insert and not last_date:
+                        backfill_rows.extend(prices_to_insert)
+                        logging.info(f"[{code}] {len(prices_to_insert)}일치 시세를 백필 적재 대기열에 추가.")
+                        if len(backfill_rows) >= self.BULK_LOAD_ROWS:
+                            self._bulk_load_prices(backfill_rows)
+                            backfill_rows = []
+                    elif prices_to_insert:
+                        # 종목 구분 없이 버퍼에 모아 PRICE_FLUSH_ROWS 행마다 한 번에 저장/커밋
+                        pending_rows.extend(prices_to_insert)
+                        logging.info(f"[{code}] {len(prices_to_insert)}일치 시세 수집 완료.")
+                        if len(pending_rows) >= self.PRICE_FLUSH_ROWS:
+                            self._flush_price_rows(pending_rows)
+                            pending_rows = []
                 except Exception as e:
                     logging.error(f"[{code}] 시세 저장 중 오류: {e}")
+            if pending_rows:
+                self._flush_price_rows(pending_rows)
+            if backfill_rows:
+                self._bulk_load_prices(backfill_rows)
+            self._update_price_fetch_failures(failed_ids, recovered_ids, today)
             logging.info("일별 시세 저장 작업 완료.")
         except Exception as e:
+            self.db_access.rollback()
             logging.error(f"save_daily_prices 실행 중 오류 발생: {e}")
+        finally:
+            self.close_http_session()
+
+    def _update_price_fetch_failures(self, failed_ids, recovered_ids, today):
+        """시세 수집 실패 종목의 실패 횟수를 증가시키고, 복구된 종목은 0으로 초기화 (각각 executemany 한 번)"""
+        if not failed_ids and not recovered_ids:
+            return
+        self._companies_cache = None
+        if failed_ids:
+            self.db_access.execute_many_query(
+                "UPDATE companies SET price_fetch_failures = price_fetch_failures + 1, price_fetch_failed_at = %s WHERE id = %s",
+                [(today, company_id) for company_id in failed_ids]
+            )
+            logging.info(f"시세 수집 실패 종목 {len(failed_ids)}개의 실패 횟수를 갱신했습니다.")
+        if recovered_ids:
+            self.db_access.execute_many_query(
+                "UPDATE companies SET price_fetch_failures = 0 WHERE id = %s",
+                [(company_id,) for company_id in recovered_ids]
+            )
+
+    def _flush_price_rows(self, rows):
+        """여러 종목의 증분 시세 행을 multi-row INSERT로 저장하고 한 번 커밋"""
+        saved = self.db_access.execute_multi_row_insert(self.PRICES_INSERT_CLAUSE, rows, self.PRICES_UPSERT_SUFFIX)
+        if saved is not None:
+            logging.info(f"시세 {len(rows)}건을 저장했습니다.")
+
+    def _fetch_price_jobs(self, jobs):
+        """시세 조회 작업들을 실행하여 (작업, 시세 행 리스트, 예외)를 완료 순서대로 반환
+
+        KRX 스냅샷으로 이미 채워진 작업은 바로 반환하고, 나머지는 스레드 풀에서 DataReader를 동시에 호출합니다.
+        """
+        def fetch(job):
+            company_id, code, fetch_start_date = job[:3]
+            try:
+                return job, self._fetch_price_rows(company_id, code, fetch_start_date), None
+            except Exception as e:
+                return job, None, e
+
+        network_jobs = []
+        for job in jobs:
+            if job[5] is not None:
+                yield job, job[5], None
+            else:
+                network_jobs.append(job)
+
+        if not network_jobs:
+            return
+        logging.info(f"{len(network_jobs)}개 종목의 시세를 {self.PRICE_FETCH_WORKERS}개 스레드로 조회합니다.")
+        with ThreadPoolExecutor(max_workers=self.PRICE_FETCH_WORKERS) as executor:
+            futures = [executor.submit(fetch, job) for job in network_jobs]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _get_companies(self, limit=None):
+        """시세 대상 종목 (id, code, price_fetch_failures, price_fetch_failed_at) 목록 (ETF 제외, 인스턴스에 캐시)"""
+        if self._companies_cache is None:
+            query = "SELECT id, code, price_fetch_failures, price_fetch_failed_at FROM companies WHERE market != 'ETF' ORDER BY id"
+            self._companies_cache = self.db_access.fetch_all(query) or []
+        return self._companies_cache[:limit] if limit else self._companies_cache
+
+    def _get_company_ids(self):
+        """종목코드 → companies.id 매핑 (1회 조회 후 인스턴스에 캐시)"""
+        if self._company_id_cache is None:
+            rows = self.db_access.fetch_all("SELECT code, id FROM companies")
+            if rows is None:  # 조회 오류는 캐시하지 않음
+                return {}
+            self._company_id_cache = dict(rows)
+        return self._company_id_cache
+
+    def _get_latest_krx_snapshot(self):
+        """최근 거래일 KRX 전체 종목 시세를 한 번에 가져옴
+
+        StockListing('KRX')에는 기준일이 없으므로, 오늘이 거래일이고 장 마감(KRX_SNAPSHOT_AFTER) 이후에
+        받은 목록일 때만 당일 종가로 사용합니다. 장중/휴장일에는 빈 스냅샷을 반환해 종목별 DataReader 조회로 처리합니다.
+        Returns:
+            tuple: (직전 거래일, 최근 거래일, {종목코드: (시가, 고가, 저가, 종가, 거래량)}), 사용할 수 없으면 (None, None, {})
+        """
+        try:
+            now = datetime.datetime.now()
+            market_closed_at = datetime.datetime.combine(now.date(), self.KRX_SNAPSHOT_AFTER)
+            if now < market_closed_at:
+                logging.info("장 마감 전이므로 KRX 시세 스냅샷을 사용하지 않고 종목별로 조회합니다.")
+                return None, None, {}
+
+            # 거래일은 KOSPI 지수 일봉 날짜 기준 (최근 거래일이 오늘이 아니면 목록 시세의 기준일을 확인할 수 없음)
+            index_df = fdr.DataReader('KS11', start=now.date() - datetime.timedelta(days=14))
+            if index_df is None or len(index_df) < 2:
+                return None, None, {}
+            prev_trading_day, latest_trading_day = index_df.index[-2].date(), index_df.index[-1].date()
+            if latest_trading_day != now.date():
+                logging.info(f"오늘({now.date()})은 거래일이 아니므로 KRX 시세 스냅샷을 사용하지 않고 종목별로 조회합니다.")
+                return None, None, {}
+
+            # save_stock_info에서 받은 목록도 장 마감 이후에 받은 것만 재사용 (장중 목록은 현재가라 종가가 아님)
+            if self._krx_listing is not None and self._krx_listing_at and self._krx_listing_at >= market_closed_at:
+                listing = self._krx_listing
+            else:
+                listing = fdr.StockListing('KRX')
+            code_column = 'Code' if 'Code' in listing.columns else 'Symbol'
+            ohlcv_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+            if code_column not in listing.columns or not set(ohlcv_columns).issubset(listing.columns):
+                return None, None, {}
+
+            # 거래정지 등 시가가 없는 종목은 개별 조회로 처리
+            listing = listing[pd.to_numeric(listing['Open'], errors='coerce') > 0]
+            ohlc = listing[ohlcv_columns[:4]].to_numpy(dtype='float64').tolist()
+            volumes = listing['Volume'].to_numpy(dtype='int64').tolist()
+            snapshot = {code: (o, h, l, c, v) for code, (o, h, l, c), v in zip(listing[code_column], ohlc, volumes)}
+            logging.info(f"KRX 시세 스냅샷 {len(snapshot)}건 ({latest_trading_day})을 가져왔습니다.")
+            return prev_trading_day, latest_trading_day, snapshot
+        except Exception as e:
+            logging.warning(f"KRX 시세 스냅샷 조회 실패 — 종목별로 조회합니다: {e}")
+            return None, None, {}
+
+    def save_daily_prices_bulk(self, start_date=None, limit=None, full_rebuild=True):
+        """최초 적재(seed) 전용 일별 시세 대량 저장.
+
+        prices 테이블이 비어 있을 때만 unique 인덱스를 제거하고 unique/foreign key 검사를 끈 상태로
+        ON DUPLICATE KEY 없는 INSERT를 수행한 뒤 인덱스를 재생성합니다.
+        full_rebuild=False 이거나 테이블에 데이터가 있으면 일반 증분 저장(save_daily_prices)으로 위임합니다.
+        """
+        if not full_rebuild:
+            return self.save_daily_prices(start_date=start_date, limit=limit)
+
+        has_rows = self.db_access.fetch_one("SELECT EXISTS(SELECT 1 FROM prices)")
+        if not has_rows or has_rows[0]:
+            logging.info("prices 테이블에 기존 데이터가 있어 일반 증분 저장으로 진행합니다.")
+            return self.save_daily_prices(start_date=start_date, limit=limit)
+
+        companies = [(company_id, code) for company_id, code, *_ in self._get_companies(limit)]
+        if not companies:
+            logging.warning("시세를 저장할 종목이 없습니다.")
+            return
+
+        if not start_date:
+            start_date = (datetime.date.today() - datetime.timedelta(days=365)).strftime('%Y-%m-%d')
+
+        # unique 인덱스별 컬럼을 인덱스 내 순서대로 조회 (재생성 시 같은 정의로 복원)
+        index_query = """
+        SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'prices' AND NON_UNIQUE = 0 AND INDEX_NAME <> 'PRIMARY'
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """
+        index_rows = self.db_access.fetch_all(index_query)
+        if index_rows is None:
+            logging.error("prices 테이블 unique 인덱스 정보를 조회하지 못해 시세 초기 적재를 중단합니다.")
+            return
+        unique_indexes = {}
+        for index_name, column_name in index_rows:
+            unique_indexes.setdefault(index_name, []).append(column_name)
+
+        logging.info(f"시세 초기 적재(bulk) 시작: {len(companies)}개 종목, unique 인덱스 {list(unique_indexes)} 일시 제거")
+        dropped_indexes = []
+        try:
+            self.db_access.execute_query("SET unique_checks = 0")
+            self.db_access.execute_query("SET foreign_key_checks = 0")
+            for index_name in unique_indexes:
+                if not self.db_access.execute_query(f"ALTER TABLE prices DROP INDEX `{index_name}`"):
+                    # 일부 인덱스만 제거된 상태로 적재하지 않도록 중단 (이미 제거한 인덱스와 검사 옵션은 finally에서 복원)
+                    logging.error(f"prices 테이블 unique 인덱스 '{index_name}' 제거 실패 — 시세 초기 적재를 중단합니다.")
+                    return
+                dropped_indexes.append(index_name)
+
+            pending_rows = []
+            for company_id, code in companies:
+                try:
+                    prices_to_insert = self._fetch_price_rows(company_id, code, start_date)
+                    if prices_to_insert:
+                        pending_rows.extend(prices_to_insert)
+                        logging.info(f"[{code}] {len(prices_to_insert)}일치 시세 수집 완료.")
+                except Exception as e:
+                    logging.error(f"[{code}] 시세 수집 중 오류: {e}")
+
+                if len(pending_rows) >= self.BULK_LOAD_ROWS:
+                    self._bulk_load_prices(pending_rows)
+                    pending_rows = []
+
+            if pending_rows:
+                self._bulk_load_prices(pending_rows)
+        finally:
+            # 제거한 인덱스를 원래 컬럼 순서대로 재생성한 후 세션 검사 옵션 복원
+            for index_name in dropped_indexes:
+                index_columns = ', '.join(f"`{column}`" for column in unique_indexes[index_name])
+                if not self.db_access.execute_query(f"ALTER TABLE prices ADD UNIQUE KEY `{index_name}` ({index_columns})"):
+                    logging.error(f"prices 테이블 unique 인덱스 '{index_name}' 재생성 실패. 중복 데이터를 확인하세요.")
+            self.db_access.execute_query("SET foreign_key_checks = 1")
+            self.db_access.execute_query("SET unique_checks = 1")
+            self.close_http_session()
+        logging.info("시세 초기 적재(bulk) 작업 완료.")
+
+    def _bulk_load_prices(self, rows):
+        """시세 행을 LOAD DATA로 임시 staging 테이블에 적재한 뒤 INSERT…SELECT로 prices에 병합 (실패 시 multi-row INSERT)"""
+        columns = ('company_id', 'trade_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+        self.db_access.upsert_via_staging('prices', 'prices_staging', columns, rows, self.PRICES_UPSERT_SUFFIX)
+
+    def _fetch_price_rows(self, company_id, code, fetch_start_date):
+        """Naver 차트 XML에서 시세를 받아 prices INSERT용 튜플 리스트로 변환 (실패 시 FinanceDataReader로 대체)"""
+        try:
+            return self._fetch_naver_price_rows(company_id, code, fetch_start_date)
+        except Exception as e:
+            logging.debug(f"[{code}] Naver 차트 시세 조회 실패 — FinanceDataReader로 대체합니다: {e}")
+
+        df = fdr.DataReader(code, start=fetch_start_date)
+        if df is None or df.empty:
+            return []
+        # 날짜 포맷과 숫자 변환을 컬럼 단위로 한 번에 처리 (iterrows 대비 행별 Series 생성 비용 제거)
+        dates = df.index.strftime('%Y-%m-%d').tolist()
+        # float64/int64 배열을 tolist()로 변환해 numpy 스칼라 대신 파이썬 float/int를 바인딩 (DECIMAL 변환은 MySQL이 수행)
+        ohlc = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype='float64').tolist()
+        volumes = df['Volume'].to_numpy(dtype='int64').tolist()
+        return [(company_id, d, o, h, l, c, v) for d, (o, h, l, c), v in zip(dates, ohlc, volumes)]
+
+    def _fetch_naver_price_rows(self, company_id, code, fetch_start_date):
+        """Naver 차트 XML(fdr의 KRX 일봉 소스)을 공용 Session으로 직접 요청해 시세 튜플 리스트로 변환
+
+        DataFrame을 만들지 않고 '날짜|시가|고가|저가|종가|거래량' 항목을 바로 튜플로 바꿉니다.
+        응답에 항목이 하나도 없으면(잘못된 코드 등) 예외를 발생시켜 호출 측에서 fdr로 대체하게 합니다.
+        """
+        start = datetime.datetime.strptime(fetch_start_date, '%Y-%m-%d').date()
+        # 조회 구간의 영업일 수만큼만 요청 (공휴일이 섞여도 부족하지 않음)
+        count = len(pd.bdate_range(start, datetime.date.today())) + 1
+        response = self._get_http_session().get(
+            self.NAVER_CHART_URL,
+            params={'symbol': code, 'timeframe': 'day', 'count': count, 'requestType': 0},
+            timeout=10
+        )
+        response.raise_for_status()
+        items = etree.fromstring(response.content).xpath('//item/@data')
+        if not items:
+            raise ValueError("차트 응답에 시세 항목이 없습니다.")
+
+        start_key = start.strftime('%Y%m%d')
+        rows = []
+        for item in items:
+            trade_date, open_price, high_price, low_price, close_price, volume = item.split('|')
+            if trade_date < start_key:
+                continue
+            rows.append((
+                company_id, f"{trade_date[:4]}-{trade_date[4:6]}-{trade_date[6:]}",
+                float(open_price), float(high_price), float(low_price), float(close_price), int(volume)
+            ))
+        return rows
 
     def update_risk_metrics(self, limit=None):
         """DB에 저장된 주가 정보를 바탕으로 1일 최대 하락률을 계산하여 daily_financials에 업데이트"""
@@ -355,24 +970,6 @@ class StockManager:
             
             today_date = datetime.date.today()
             
-            cursor = self.db_access.connection.cursor(dictionary=True)
-            # daily_financials에 오늘 날짜 데이터가 있는 종목만 대상으로 함 (UPDATE 효율성 및 정합성)
-            company_query = """
-            SELECT c.id, c.code 
-            FROM companies c
-            JOIN daily_financials df ON c.code = df.code
-            WHERE df.date = %s
-            """
-            if limit:
-                company_query += f" LIMIT {limit}"
-            cursor.execute(company_query, (today_date,))
-            companies = cursor.fetchall()
-            cursor.close()
-            
-            if not companies:
-                logging.warning("리스크 지표를 업데이트할 대상 종목이 없습니다 (daily_financials 데이터 부재).")
-                return
-
             start_date = (today_date - datetime.timedelta(days=365)).strftime('%Y-%m-%d')
 
             # KOSPI 수익률을 루프 밖에서 한 번만 가져옴
@@ -385,111 +982,267 @@ class StockManager:
             except Exception as e:
                 logging.warning(f"KOSPI 데이터 로드 실패 — 베타 계산을 건너뜁니다: {e}")
 
-            for company in companies:
-                company_id = company['id']
-                code = company['code']
+            # daily_financials에 오늘 날짜 데이터가 있는 종목만 대상으로 함 (UPDATE 효율성 및 정합성)
+            # 대상 종목과 1년치 종가를 한 번의 JOIN으로 (종목, 날짜) 순서로 스트리밍하여 종목별 쿼리를 없앰
+            # (daily_financials.company_id가 채워져 있으므로 companies 조인 없이 대상 종목을 구함)
+            target_query = """
+            SELECT df.company_id AS id, df.code
+            FROM daily_financials df
+            WHERE df.date = %s AND df.company_id IS NOT NULL
+            """
+            params = [today_date]
+            if limit:
+                target_query += " LIMIT %s"
+                params.append(int(limit))
+            query = f"""
+            SELECT t.id, t.code, p.trade_date, p.close_price
+            FROM ({target_query}) t
+            LEFT JOIN prices p ON p.company_id = t.id AND p.trade_date >= %s
+            ORDER BY t.id, p.trade_date
+            """
+            params.append(start_date)
 
-                query = """
-                SELECT trade_date, close_price
-                FROM prices
-                WHERE company_id = %s AND trade_date >= %s
-                ORDER BY trade_date ASC
-                """
-                prices = self.db_access.fetch_all(query, (company_id, start_date))
+            # fetch_iter 청크를 종목 경계에서 잘라 완결된 종목만 계산하고, 마지막(다음 청크로 이어질 수 있는) 종목은 보류
+            # → 메모리에는 한 청크와 종목 하나 분량의 시세만 유지 (조회 오류는 예외로 전파되어 부분 데이터로 갱신하지 않음)
+            updates = []
+            skipped = []
+            n_companies = 0
+            pending = []
+            for chunk in self.db_access.fetch_iter(query, params):
+                rows = pending + chunk
+                split = len(rows)
+                while split > 0 and rows[split - 1][0] == rows[-1][0]:
+                    split -= 1
+                rows, pending = rows[:split], rows[split:]
+                if rows:
+                    n_companies += self._collect_risk_updates(rows, market_returns, today_date, updates, skipped)
+            if pending:
+                n_companies += self._collect_risk_updates(pending, market_returns, today_date, updates, skipped)
 
-                logging.info(f"[{code}] Found {len(prices) if prices else 0} price records.")
+            if not n_companies:
+                logging.warning("리스크 지표를 업데이트할 대상 종목이 없습니다 (daily_financials 데이터 부재).")
+                return
+            logging.info(f"{n_companies}개 종목의 리스크 지표를 계산했습니다.")
 
-                # 최소 2일치 데이터가 있어야 하락률 계산 가능
-                if not prices or len(prices) < 2:
-                    logging.warning(f"[{code}] Skipping metric calculation due to insufficient price data ({len(prices) if prices else 0} records).")
-                    continue
+            if skipped:
+                logging.warning(f"시세 데이터가 부족한 {len(skipped)}개 종목은 리스크 지표 계산을 건너뜁니다: {', '.join(skipped[:20])}")
+            if not updates:
+                logging.warning("리스크 지표를 업데이트할 대상 종목이 없습니다 (daily_financials 데이터 부재).")
+                return
 
-                df = pd.DataFrame(prices, columns=['trade_date', 'close_price'])
-                df['close_price'] = df['close_price'].astype(float)
-
-                # 1일 수익률 계산
-                df['daily_return'] = df['close_price'].pct_change() * 100
-
-                # 1일 최대 하락률 (가장 작은 값)
-                max_fall_rate = df['daily_return'].min()
-                logging.info(f"[{code}] Calculated max fall rate: {max_fall_rate}")
-
-                # 하락이 없거나(NaN, 0 이상) 데이터가 부족한 경우 0으로 처리
-                if pd.isna(max_fall_rate) or max_fall_rate >= 0:
-                    max_fall_rate = 0.0
-
-                # 베타 계산: Cov(종목수익률, KOSPI수익률) / Var(KOSPI수익률)
-                beta = None
-                if market_returns is not None and len(df) >= 30:
-                    df['trade_date'] = pd.to_datetime(df['trade_date']).dt.normalize()
-                    stock_returns = df.set_index('trade_date')['close_price'].pct_change()
-                    aligned = pd.DataFrame({'stock': stock_returns, 'market': market_returns}).dropna()
-                    if len(aligned) >= 30:
-                        market_var = aligned['market'].var()
-                        if market_var > 0:
-                            beta = round(float(aligned['stock'].cov(aligned['market']) / market_var), 4)
-
-                logging.info(f"[{code}] max_fall_rate={max_fall_rate}, beta={beta}")
-                update_query = "UPDATE daily_financials SET max_daily_fall_rate = %s, beta = %s WHERE code = %s AND date = %s"
-                self.db_access.execute_query(update_query, (max_fall_rate, beta, code, today_date))
+            # 계산 결과를 executemany UPDATE 한 번으로 반영
+            update_query = "UPDATE daily_financials SET max_daily_fall_rate = %s, beta = %s WHERE code = %s AND date = %s"
+            self.db_access.execute_many_query(update_query, updates)
             
             logging.info("리스크 지표 업데이트 완료.")
         except Exception as e:
             logging.error(f"리스크 지표 업데이트 중 오류 발생: {e}")
 
+    def _collect_risk_updates(self, rows, market_returns, today_date, updates, skipped):
+        """종목 단위로 완결된 (id, code, trade_date, close_price) 행들의 리스크 지표를 계산해
+        UPDATE 파라미터는 updates에, 시세가 부족한 종목코드는 skipped에 추가하고 계산한 종목 수를 반환"""
+        _, codes, trade_dates, close_prices = zip(*rows)
+        codes, n_prices, max_fall, beta = self._calculate_risk_metrics(codes, trade_dates, close_prices, market_returns)
+
+        # 최소 2일치 데이터가 있어야 하락률 계산 가능
+        enough = n_prices >= 2
+        skipped.extend(codes[~enough].tolist())
+        updates.extend(
+            (fall, None if np.isnan(b) else b, code, today_date)
+            for code, fall, b in zip(codes[enough].tolist(), max_fall[enough].tolist(), beta[enough].tolist())
+        )
+        return len(codes)
+
+    def _calculate_risk_metrics(self, codes, trade_dates, close_prices, market_returns):
+        """(종목, 거래일) 순으로 정렬된 전체 종가 컬럼으로 종목별 1일 최대 하락률과 KOSPI 대비 베타를 한 번에 계산
+
+        Returns:
+            tuple: (종목코드, 시세 수, 1일 최대 하락률, 베타) numpy 배열 — 종목당 한 행, 베타 없음은 NaN
+        """
+        codes = np.asarray(codes, dtype=object)
+        close = np.array([np.nan if c is None else c for c in close_prices], dtype=np.float64)
+
+        market = np.full(len(close), np.nan)
+        if market_returns is not None and len(market_returns):
+            # 거래일을 KOSPI 날짜 배열에서 이진 탐색으로 매칭 (시세가 없는 행은 NaT)
+            dates = np.array(trade_dates, dtype='datetime64[D]')
+            market_dates = market_returns.index.to_numpy(dtype='datetime64[D]')
+            market_values = market_returns.to_numpy(dtype=np.float64)
+            pos = np.clip(np.searchsorted(market_dates, dates), 0, len(market_dates) - 1)
+            matched = market_dates[pos] == dates
+            market[matched] = market_values[pos[matched]]
+
+        # 종목 구간 시작 위치 (쿼리가 company_id, trade_date 순으로 정렬되어 있음)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        n_prices, max_fall, beta = _segment_risk_kernel(close, market, starts)
+        return codes[starts], n_prices, max_fall, beta
+
     # --- FnGuide Scraping Helpers ---
-    def get_financial_data_from_fnguide(self, code, is_retry=False):
+    def _get_http_session(self):
+        """FnGuide/Naver 차트 요청에 공용으로 사용할 requests.Session (커넥션 풀 + 재시도)"""
+        if self._http_session is not None:
+            return self._http_session
+        with self._http_session_lock:
+            if self._http_session is None:
+                session = requests.Session()
+                retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',))
+                pool_size = max(32, self.FNGUIDE_WORKERS, self.PRICE_FETCH_WORKERS)
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                # gzip/deflate(brotli 설치 시 br 포함) 압축 응답 허용 — 스트리밍 읽기 시 자동으로 해제됨
+                session.headers.update(make_headers(accept_encoding=True, keep_alive=True, user_agent='Mozilla/5.0'))
+                self._http_session = session
+        return self._http_session
+
+    def close_http_session(self):
+        """FnGuide/Naver 차트 요청용 Session과 커넥션 풀 정리"""
+        with self._http_session_lock:
+            if self._http_session is not None:
+                self._http_session.close()
+                self._http_session = None
+
+    def _scrape_fnguide(self, codes, fnguide_codes):
+        """종목코드들을 스레드 풀로 동시에 스크래핑하여 완료 순서대로 (종목코드, 재무 정보 dict)를 반환
+
+        미완료 작업 수를 작업자 수의 몇 배로 제한하여 종목 수와 무관하게 Future/응답이 한꺼번에 쌓이지 않게 함
+        """
+        max_in_flight = self.FNGUIDE_WORKERS * 4
+        codes = iter(codes)
+        with ThreadPoolExecutor(max_workers=self.FNGUIDE_WORKERS) as executor:
+            in_flight = set()
+            for code in codes:
+                in_flight.add(executor.submit(self._fetch_one, code, fnguide_codes.get(code)))
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in wait(in_flight).done:
+                yield future.result()
+
+    def _fetch_one(self, code, fnguide_code=None):
+        """스레드 풀 작업 단위: (종목코드, FnGuide 재무 정보 dict) 반환"""
+        return code, self.get_financial_data_from_fnguide(code, fnguide_code=fnguide_code)
+
+    def get_financial_data_from_fnguide(self, code, is_retry=False, fnguide_code=None):
+        """FnGuide 종목 페이지에서 재무 정보를 스크래핑 (fnguide_code가 주어지면 해당 코드로 바로 조회)"""
+        if fnguide_code and fnguide_code != code:
+            return self.get_financial_data_from_fnguide(fnguide_code, is_retry=True)
+        if not is_retry and code in self._fnguide_code_alias:
+            return self.get_financial_data_from_fnguide(self._fnguide_code_alias[code], is_retry=True)
         try:
-            url = f"https://comp.fnguide.com/SVO2/ASP/SVD_Main.asp?pGB=1&gicode=A{code}&cID=&MenuYn=Y&ReportGB=&NewMenuID=101&stkGb=701"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=5)
-            
-            if "Snapshot 일부 종목에 한해" in response.text and not is_retry:
-                return self.get_financial_data_from_fnguide(code[:-1] + '0', is_retry=True)
+            url = self.FNGUIDE_URL_PREFIX + code + self.FNGUIDE_URL_SUFFIX
+            html, doc = self._read_fnguide_page(url)
+
+            if "Snapshot 일부 종목에 한해" in html and not is_retry:
+                return self._retry_with_common_code(code)
 
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
             data = {}
 
             # 시가총액, 상장주식수 스크래핑 (corp_group1)
             # Marcap은 '조/억원' 단위를 파싱하는 별도 헬퍼 사용
-            self._extract_marcap_value(soup, '#corp_group1 > dl > dd', data, 'Marcap')
-            self._extract_numeric_value(soup, '#corp_group1 > dl:nth-child(2) > dd', data, 'Stocks')
+            self._extract_marcap_value(doc, '(//*[@id="corp_group1"]/dl/dd)[1]', data, 'Marcap')
+            self._extract_numeric_value(doc, '(//*[@id="corp_group1"]/*[2][self::dl]/dd)[1]', data, 'Stocks')
 
             summary_mapping = [
-                ('div.corp_group2 > dl:nth-of-type(3) > dd', 'IndustPER'),
-                ('div.corp_group2 > dl:nth-of-type(5) > dd', 'DivRate')
+                ('(//div[contains(concat(" ", normalize-space(@class), " "), " corp_group2 ")]/dl[3]/dd)[1]', 'IndustPER'),
+                ('(//div[contains(concat(" ", normalize-space(@class), " "), " corp_group2 ")]/dl[5]/dd)[1]', 'DivRate')
             ]
-            for selector, key in summary_mapping:
-                self._extract_numeric_value(soup, selector, data, key)
+            for xpath, key in summary_mapping:
+                self._extract_numeric_value(doc, xpath, data, key)
 
-            highlight_table = soup.select_one('#highlight_D_Y')
-            if not highlight_table and not is_retry and code[-1] != '0':
-                return self.get_financial_data_from_fnguide(code[:-1] + '0', is_retry=True)
+            highlight_table = doc.get_element_by_id('highlight_D_Y', None)
+            if highlight_table is None and not is_retry and code[-1] != '0':
+                return self._retry_with_common_code(code)
 
-            if highlight_table:
-                try:
-                    df_list = pd.read_html(StringIO(str(highlight_table)), header=0)
-                    if df_list:
-                        df = df_list[0].set_index(df_list[0].columns[0])
-                        table_mapping = {'PER': 'PER', 'PBR': 'PBR', 'EPS': 'EPS', 'BPS': 'BPS', 'ROE': 'ROE'}
-                        for key, row_name in table_mapping.items():
-                            self._extract_from_table(df, data, key, row_name, 5, code)
-                            self._extract_from_table(df, data, f"{key}_pred", row_name, 6, code)
-                except Exception:
-                    pass
-
-            self._extract_performance_issues(soup, data)
+            if highlight_table is not None:
+                # 행 이름(첫 셀) → 값 셀 목록
+                rows = []
+                for tr in highlight_table.iterfind('.//tr'):
+                    cells = [cell.text_content().strip() for cell in tr if cell.tag in ('th', 'td')]
+                    if cells:
+                        rows.append((cells[0], cells[1:]))
+                table_mapping = {'PER': 'PER', 'PBR': 'PBR', 'EPS': 'EPS', 'BPS': 'BPS', 'ROE': 'ROE'}
+                for key, row_name in table_mapping.items():
+                    self._extract_from_table(rows, data, key, row_name, 5)
+                    self._extract_from_table(rows, data, f"{key}_pred", row_name, 6)
+
+            self._extract_performance_issues(doc, data)
             return data
         except Exception:
             return {}
 
-    def _extract_marcap_value(self, soup, selector, data_dict, key):
+    def _retry_with_common_code(self, code):
+        """'0' 접미사 코드로 재시도하고, 성공하면 코드 매핑을 기억"""
+        retry_code = code[:-1] + '0'
+        data = self.get_financial_data_from_fnguide(retry_code, is_retry=True)
+        if data:
+            self._fnguide_code_alias[code] = retry_code
+        return data
+
+    def _read_fnguide_page(self, url):
+        """FnGuide 페이지를 읽어 (HTML 문자열, lxml 문서)로 반환 (디스크 캐시가 TTL 이내면 캐시 사용)
+
+        캐시 파일은 전체 페이지가 아니라 스크래핑에 필요한 요소까지만 받은 앞부분입니다
+        (_download_fnguide_page 참고). 이 캐시는 get_financial_data_from_fnguide 전용입니다.
+        """
+        cache_path = None
+        if self.FNGUIDE_CACHE_TTL > 0:
+            cache_path = os.path.join(self.FNGUIDE_CACHE_DIR, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.html')
+            try:
+                if time.time() - os.path.getmtime(cache_path) < self.FNGUIDE_CACHE_TTL:
+                    with open(cache_path, encoding='utf-8') as f:
+                        html = f.read()
+                    return html, lxml_html.fromstring(html)
+            except OSError:
+                pass
+
+        html, doc = self._download_fnguide_page(url)
+
+        if cache_path:
+            try:
+                os.makedirs(self.FNGUIDE_CACHE_DIR, exist_ok=True)
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(html)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logging.warning(f"FnGuide 캐시 저장 실패 ({url}): {e}")
+        return html, doc
+
+    def _download_fnguide_page(self, url):
+        """FnGuide 페이지를 스트리밍으로 받으면서 파싱하고, 필요한 요소가 모두 닫히면 나머지 응답은 받지 않고 종료
+
+        Returns:
+            tuple: (지금까지 받은 HTML 문자열, 같은 내용으로 만든 lxml.html 문서) — 페이지는 한 번만 파싱됩니다.
+        """
+        with self._get_http_session().get(url, timeout=5, stream=True) as response:
+            response.raise_for_status()
+            encoding = response.encoding or 'utf-8'
+            parser = etree.HTMLPullParser(events=('end',), encoding=encoding)
+            # lxml.html.fromstring과 같은 HtmlElement 트리(get_element_by_id, text_content 사용 가능)를 생성
+            parser.set_element_class_lookup(lxml_html.HtmlElementClassLookup())
+            remaining_ids = set(self.FNGUIDE_TARGET_IDS)
+            remaining_classes = set(self.FNGUIDE_TARGET_CLASSES)
+            chunks = []
+            for chunk in response.iter_content(chunk_size=16384):
+                chunks.append(chunk)
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    remaining_ids.discard(element.get('id'))
+                    if remaining_classes:
+                        remaining_classes.difference_update((element.get('class') or '').split())
+                if not remaining_ids and not remaining_classes:
+                    break
+            doc = parser.close()
+            return b''.join(chunks).decode(encoding, errors='replace'), doc
+
+    def _extract_marcap_value(self, doc, xpath, data_dict, key):
         """FnGuide의 '조/억원' 단위 시가총액 텍스트를 파싱하여 숫자(KRW 단위)로 변환"""
         try:
-            element = soup.select_one(selector)
-            if element:
-                text = element.text.strip().replace(',', '')
+            elements = doc.xpath(xpath)
+            if elements:
+                text = elements[0].text_content().strip().replace(',', '')
                 total_hm_value = 0  # hundred-million (억)
                 if '조' in text:
                     parts = text.split('조')
@@ -510,43 +1263,45 @@ class StockManager:
         except Exception:
             data_dict[key] = None
 
-    def _extract_from_table(self, df, data_dict, data_key, row_name, col_index, code):
+    def _extract_from_table(self, rows, data_dict, data_key, row_name, col_index):
+        """(행 이름, 값 셀 목록) 리스트에서 row_name을 포함하는 첫 행의 col_index번째 값을 숫자로 저장"""
         try:
-            target_row_name = next(ix for ix in df.index if row_name in ix)
-            target_row = df.loc[target_row_name]
-            if isinstance(target_row, pd.DataFrame): target_row = target_row.iloc[0]
-            if col_index < len(target_row):
-                value = target_row.iloc[col_index]
-                if pd.notna(value):
-                    value_str = str(value).replace(',', '').replace('%', '').strip()
-                    if value_str and value_str not in ('-', 'N/A'):
-                        try: data_dict[data_key] = float(value_str)
-                        except: pass
+            values = next(cells for name, cells in rows if row_name in name)
+            if col_index < len(values):
+                value_str = _NUMERIC_CLEAN_RE.sub('', values[col_index])
+                if value_str and value_str not in ('-', 'N/A'):
+                    try: data_dict[data_key] = float(value_str)
+                    except: pass
         except: pass
 
-    def _extract_numeric_value(self, soup, selector, data_dict, key):
+    def _extract_numeric_value(self, doc, xpath, data_dict, key):
         try:
-            element = soup.select_one(selector)
-            if element:
-                text = element.text.strip().replace(',', '').replace('%', '')
+            elements = doc.xpath(xpath)
+            if elements:
+                text = _NUMERIC_CLEAN_RE.sub('', elements[0].text_content())
                 if text and text not in ('N/A', '-'):
                     data_dict[key] = float(text)
         except: data_dict[key] = None
 
-    def _extract_performance_issues(self, soup, data_dict):
+    def _extract_performance_issues(self, doc, data_dict):
         try:
-            issue_table = soup.select_one('#svdMainGrid2')
-            if not issue_table: return
-            df_list = pd.read_html(StringIO(str(issue_table)))
-            if not df_list: return
-            df_issue = df_list[0]
+            issue_table = doc.get_element_by_id('svdMainGrid2', None)
+            if issue_table is None: return
+            trs = issue_table.findall('.//tr')
+            header_trs = issue_table.findall('./thead/tr')
+            body_trs = issue_table.findall('./tbody/tr')
+            # 헤더는 thead 마지막 행(없으면 첫 행), 값은 첫 데이터 행에서 같은 위치의 셀
+            header_tr = header_trs[-1] if header_trs else (trs[0] if trs else None)
+            data_tr = body_trs[0] if body_trs else (trs[1] if len(trs) > 1 else None)
+            if header_tr is None or data_tr is None: return
+            headers = [cell.text_content() for cell in header_tr if cell.tag in ('th', 'td')]
+            values = [cell.text_content().strip() for cell in data_tr if cell.tag in ('th', 'td')]
             keywords = {'perf_yoy': '전년동기대비', 'perf_vs_3m_ago': '3개월전'}
             for key, keyword in keywords.items():
-                for col in df_issue.columns:
-                    if keyword in str(col):
-                        val = df_issue.loc[0, col]
-                        if pd.notna(val) and str(val).strip() not in ('-', 'N/A'):
-                            data_dict[key] = str(val).strip()
+                for i, header in enumerate(headers):
+                    if keyword in header:
+                        if i < len(values) and values[i] and values[i] not in ('-', 'N/A'):
+                            data_dict[key] = values[i]
                         break
         except: pass
 
@@ -1,10 +1,74 @@
 import logging
 import datetime
 import os
+import contextlib
+import numpy as np
 import pandas as pd
-from openpyxl.styles import PatternFill, Font
 from AppManager import get_db_connection
 
+
+# _valuation_kernel 결과 코드 (ValuationManager에서 평가 결과 문자열로 변환)
+RESULT_CODE_UNDERVALUED, RESULT_CODE_FAIR, RESULT_CODE_OVERVALUED = 0, 1, 2
+
+
+def _valuation_kernel(num, required_roe, risk_free_rate, equity_risk_premium, risk_factor, max_discount_rate,
+                      rim_max_g_ratio, weights, conservative_factor, pegr_min, pegr_max, low_threshold, high_threshold):
+    """전 종목 적정주가/괴리율/PEG/평가 결과 코드를 float64 배열 연산으로 한 번에 계산
+
+    num은 {컬럼명: float64 배열(NaN = 값 없음)}, weights는 (RIM, PER, PEGR) 가중치입니다.
+    Returns:
+        tuple: (eps/bps/roe 성장률, 할인율(소수), 적정주가, 괴리율, PEG(NaN = 없음), 결과 코드 int8 배열)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 성장률 (기준값이 0보다 크고 예측값이 있을 때만, 아니면 0)
+        def growth(base, pred):
+            mask = (base > 0) & ~np.isnan(pred) & (pred != 0)
+            return np.where(mask, (pred - base) / base * 100, 0.0)
+
+        eps_growth_rate = growth(num['eps'], num['eps_pred'])
+        bps_growth_rate = growth(num['bps'], num['bps_pred'])
+        roe_growth_rate = growth(num['roe'], num['roe_pred'])
+
+        # 할인율: CAPM(베타) → 변동성 proxy → REQUIRED_ROE 순
+        beta, fall = num['beta'], num['max_daily_fall_rate']
+        r = np.where(~np.isnan(beta), risk_free_rate + beta * equity_risk_premium,
+                     risk_free_rate + np.abs(fall) * risk_factor)
+        r = np.minimum(np.maximum(r, required_roe), max_discount_rate)
+        r = np.where(np.isnan(beta) & np.isnan(fall), required_roe, r) / 100
+
+        # RIM (성장률 g 반영, Gordon Growth 조건 g < r)
+        roe_pred, bps_pred, bps = num['roe_pred'], num['bps_pred'], num['bps']
+        g = np.where(bps > 0, (bps_pred - bps) / bps, 0.0)
+        g = np.maximum(-0.30, np.minimum(g, r * rim_max_g_ratio))
+        denominator = r - g
+        rim = np.where(np.abs(denominator) < 1e-6, bps_pred,
+                       np.maximum(0.0, bps_pred + (roe_pred / 100 - r) * bps_pred / denominator))
+        fv_rim = np.where((roe_pred >= 0) & (bps_pred > 0), rim, 0.0)
+
+        # 업종 PER / PEGR
+        eps_pred, indust_per = num['eps_pred'], num['indust_per']
+        fv_per = np.where((indust_per > 0) & (eps_pred > 0), eps_pred * indust_per, 0.0)
+        pegr_mask = (eps_pred > 0) & (eps_growth_rate > pegr_min) & (eps_growth_rate < pegr_max)
+        fv_pegr = np.where(pegr_mask, eps_growth_rate * eps_pred, 0.0)
+
+        # 가중 혼합 + 안전마진 (0보다 큰 모델만 반영)
+        fvs = np.stack([fv_rim, fv_per, fv_pegr])
+        model_weights = np.array(weights)[:, None] * (fvs > 0)
+        weighted_sum = np.where(model_weights > 0, fvs * model_weights, 0.0).sum(axis=0)
+        total_weight = model_weights.sum(axis=0)
+        fair_value = np.where(total_weight > 0, weighted_sum / total_weight * conservative_factor, 0.0)
+
+        # 분류 및 지표
+        discrepancy_ratio = (num['current_price'] - fair_value) / fair_value * 100
+        per = num['per']
+        peg_ratio = np.where((per > 0) & (eps_growth_rate > pegr_min), per / eps_growth_rate, np.nan)
+        result_code = np.full(len(fair_value), RESULT_CODE_FAIR, dtype=np.int8)
+        result_code[discrepancy_ratio < low_threshold] = RESULT_CODE_UNDERVALUED
+        result_code[discrepancy_ratio > high_threshold] = RESULT_CODE_OVERVALUED
+
+    return eps_growth_rate, bps_growth_rate, roe_growth_rate, r, fair_value, discrepancy_ratio, peg_ratio, result_code
+
+
 class ValuationManager:
     """
     주식 가치 평가를 관리하는 클래스
@@ -14,6 +78,31 @@ class ValuationManager:
     _RESULT_OVERVALUED = "고평가"
     _RESULT_FAIR = "적정"
     _RESULT_NA = "N/A"
+
+    # Excel 보고서 컬럼별 숫자 서식 (code는 텍스트, 가격은 천 단위 콤마, 실적 지표/할인율은 소수점 2자리)
+    _EXCEL_NUMBER_FORMATS = {
+        'code': '@',
+        'current_price': '#,##0', 'fair_value': '#,##0',
+        'perf_yoy': '0.00', 'perf_vs_3m_ago': '0.00', 'discount_rate': '0.00',
+    }
+
+    # 평가 데이터 조회/계산 청크 크기 (서버 측 커서 fetchmany 단위)
+    VALUATION_CHUNK_ROWS = 1000
+
+    # valuations 저장 컬럼 순서 (스테이징 테이블/LOAD DATA 파일과 동일)
+    VALUATION_COLUMNS = (
+        'code', 'date', 'fair_value', 'current_price', 'discrepancy_ratio',
+        'eps_growth_rate', 'peg_ratio', 'valuation_result'
+    )
+    VALUATION_UPSERT_SUFFIX = """
+            ON DUPLICATE KEY UPDATE
+                fair_value = VALUES(fair_value),
+                current_price = VALUES(current_price),
+                discrepancy_ratio = VALUES(discrepancy_ratio),
+                eps_growth_rate = VALUES(eps_growth_rate),
+                peg_ratio = VALUES(peg_ratio),
+                valuation_result = VALUES(valuation_result)
+    """
  
     def __init__(self, db_access):
         """
@@ -49,6 +138,9 @@ class ValuationManager:
         self.PEGR_MIN_GROWTH = float(os.getenv('VAL_PEGR_MIN_GROWTH', '5'))
         self.PEGR_MAX_GROWTH = float(os.getenv('VAL_PEGR_MAX_GROWTH', '50'))
 
+        # calculate_valuation() 조회 캐시 — valuation_input_cache() 블록 안에서만 사용 (블록 밖에서는 None)
+        self._input_cache = None  # {date_str: {code: (재무 데이터..., 최신 종가, 종목명, companies.id)}}
+
     def create_valuation_table(self):
         """'valuations' 테이블을 생성하는 메서드"""
         try:
@@ -82,23 +174,16 @@ class ValuationManager:
             today = datetime.date.today()
             today_str = today.strftime('%Y-%m-%d')
 
-            all_data = self._fetch_valuation_data_bulk(today_str, limit)
-            if not all_data:
+            # 서버 측 커서로 VALUATION_CHUNK_ROWS 행씩 받아 청크마다 바로 계산 (조회 행 전체를 메모리에 올리지 않음)
+            valuation_results = []
+            fetched = 0
+            for chunk in self._iter_valuation_data_bulk(today_str, limit):
+                fetched += len(chunk)
+                valuation_results.extend(self._perform_valuation_bulk(chunk))
+            if not fetched:
                 logging.warning(f"'{today_str}' 날짜로 평가할 데이터가 없습니다.")
                 return
 
-            valuation_results = []
-            for stock_data in all_data:
-                # 필수 데이터 확인 (None 이면 계산 불가)
-                required_keys = ['code', 'roe_pred', 'bps_pred', 'current_price']
-                if not all(stock_data.get(key) is not None for key in required_keys):
-                    logging.debug(f"'{stock_data.get('code')}'에 대한 충분한 데이터가 없어 평가를 건너뜁니다.")
-                    continue
-
-                result = self._perform_valuation_calculation(stock_data)
-                if result:
-                    valuation_results.append(result)
-
             if valuation_results:
                 logging.info(f"총 {len(valuation_results)}개 종목의 가치 평가를 완료했습니다.")
                 self._save_results_to_excel(valuation_results, today_str)
@@ -109,36 +194,37 @@ class ValuationManager:
         except Exception as e:
             logging.error(f"가치 평가 계산 및 저장 중 오류 발생: {e}")
 
+    @contextlib.contextmanager
+    def valuation_input_cache(self):
+        """블록 안의 calculate_valuation() 호출이 날짜별 전 종목 조회 결과를 공유하도록 캐시를 켭니다.
+
+        블록을 벗어나면 캐시를 버리므로, 이후 시세/재무 정보가 저장되어도 오래된 값을 반환하지 않습니다.
+        """
+        self._input_cache = {}
+        try:
+            yield self
+        finally:
+            self._input_cache = None
+
     def calculate_valuation(self, code, date_str):
         """
         개별 종목의 가치를 평가하는 메서드 (단일 종목용).
         여러 종목을 평가할 때는 성능이 최적화된 calculate_and_save_valuations() 사용을 권장합니다.
+        여러 종목을 차례로 호출할 때는 valuation_input_cache() 블록 안에서 호출하면 조회를 날짜별 1회로 줄일 수 있습니다.
         """
         try:
-            # 1. DB에서 필요한 재무 정보 및 현재가 가져오기
-            # 참고: 이 메서드는 단일 종목에 대해 여러 쿼리를 실행하므로 대량 처리에는 비효율적입니다.
-            query_financials = """
-            SELECT pbr, per, indust_per, eps, roe, bps, eps_pred, roe_pred, bps_pred, perf_yoy, perf_vs_3m_ago
-            FROM daily_financials 
-            WHERE code = %s AND date = %s
-            """
-            financial_data_tuple = self.db_access.fetch_one(query_financials, (code, date_str))
-            if not financial_data_tuple or any(d is None for d in financial_data_tuple[1:4]): # eps_pred, roe_pred, bps_pred
+            # 1. 재무 정보와 현재가를 하나의 JOIN으로 가져오기 (캐시 블록 안에서는 날짜별로 한 번만 조회)
+            input_row = self._get_valuation_inputs(date_str, code).get(code)
+            fin_cols = ['pbr', 'per', 'indust_per', 'eps', 'roe', 'bps', 'eps_pred', 'roe_pred', 'bps_pred', 'perf_yoy', 'perf_vs_3m_ago']
+            financial_data_tuple = input_row[:len(fin_cols)] if input_row else None
+            if not financial_data_tuple or any(d is None for d in financial_data_tuple[6:9]): # eps_pred, roe_pred, bps_pred
                 logging.debug(f"'{code}'에 대한 충분한 재무 데이터가 없습니다.")
                 return None
 
-            fin_cols = ['pbr', 'per', 'indust_per', 'eps', 'roe', 'bps', 'eps_pred', 'roe_pred', 'bps_pred', 'perf_yoy', 'perf_vs_3m_ago']
             financial_data = dict(zip(fin_cols, financial_data_tuple))
 
-            query_price = """
-            SELECT p.close_price, c.name, c.id
-            FROM prices p
-            JOIN companies c ON p.company_id = c.id
-            WHERE c.code = %s
-            ORDER BY p.trade_date DESC LIMIT 1
-            """
-            price_data = self.db_access.fetch_one(query_price, (code,))
-            if not price_data or price_data[0] is None:
+            price_data = input_row[len(fin_cols):]
+            if price_data[0] is None:
                 logging.debug(f"'{code}'에 대한 가격 정보가 없습니다.")
                 return None
 
@@ -157,89 +243,106 @@ class ValuationManager:
             logging.error(f"'{code}' 가치 평가 중 오류: {e}")
             return None
 
-    def _fetch_valuation_data_bulk(self, date_str, limit=None):
-        """평가에 필요한 모든 종목의 재무 및 가격 데이터를 한 번의 쿼리로 가져옵니다."""
-        # 참고: 이 쿼리는 MySQL 8.0+ 또는 ROW_NUMBER()를 지원하는 DB에서 최적의 성능을 보입니다.
-        # DB가 윈도우 함수를 지원하지 않는 경우, 서브쿼리 등으로 최신 가격을 가져오는 로직 수정이 필요합니다.
+    def _get_valuation_inputs(self, date_str, code):
+        """해당 날짜의 재무 데이터와 최신 종가를 {code: 튜플}로 반환
+
+        valuation_input_cache() 블록 안에서는 전 종목을 날짜별 1회 JOIN으로 조회해 캐시하고,
+        블록 밖에서는 요청한 종목만 조회합니다.
+        튜플: (pbr, per, indust_per, eps, roe, bps, eps_pred, roe_pred, bps_pred, perf_yoy, perf_vs_3m_ago,
+               최신 종가, 종목명, companies.id)
+        """
+        if self._input_cache is not None and date_str in self._input_cache:
+            return self._input_cache[date_str]
+
+        all_codes = self._input_cache is not None
+        code_filter = "" if all_codes else " AND df.code = %s"
+        query = f"""
+        WITH latest_price AS (
+            SELECT company_id, MAX(trade_date) AS trade_date
+            FROM prices
+            {"" if all_codes else "WHERE company_id = (SELECT id FROM companies WHERE code = %s)"}
+            GROUP BY company_id
+        )
+        SELECT
+            df.code, df.pbr, df.per, df.indust_per, df.eps, df.roe, df.bps, df.eps_pred, df.roe_pred, df.bps_pred,
+            df.perf_yoy, df.perf_vs_3m_ago, p.close_price, c.name, c.id
+        FROM daily_financials df
+        JOIN companies c ON c.id = df.company_id
+        LEFT JOIN latest_price lp ON lp.company_id = df.company_id
+        LEFT JOIN prices p ON p.company_id = lp.company_id AND p.trade_date = lp.trade_date
+        WHERE df.date = %s{code_filter}
+        """
+        params = (date_str,) if all_codes else (code, date_str, code)
+        rows = self.db_access.fetch_all(query, params)
+        if rows is None:  # 조회 오류는 캐시하지 않음
+            return {}
+        # Decimal 값은 행마다 변환하지 않고 조회 결과 전체를 컬럼 단위로 한 번에 float 변환 (NULL은 None 유지)
+        numeric_cols = [
+            'pbr', 'per', 'indust_per', 'eps', 'roe', 'bps', 'eps_pred', 'roe_pred', 'bps_pred',
+            'perf_yoy', 'perf_vs_3m_ago', 'close_price'
+        ]
+        frame = pd.DataFrame.from_records(rows, columns=['code', *numeric_cols, 'name', 'id'])
+        frame[numeric_cols] = frame[numeric_cols].apply(pd.to_numeric, errors='coerce')
+        frame = frame.astype(object).where(frame.notna(), None)
+        inputs = {row[0]: row[1:] for row in frame.itertuples(index=False, name=None)}
+        if all_codes:
+            self._input_cache[date_str] = inputs
+        return inputs
+
+    def _iter_valuation_data_bulk(self, date_str, limit=None):
+        """평가에 필요한 모든 종목의 재무 및 가격 데이터를 한 번의 쿼리로 조회하여 VALUATION_CHUNK_ROWS 행씩 DataFrame으로 반환합니다."""
+        # 최신 종가는 평가 대상 종목마다 상관 서브쿼리(ORDER BY trade_date DESC LIMIT 1)로 가져옵니다.
+        # idx_cov (company_id, trade_date, close_price)를 역방향으로 한 건만 읽으므로
+        # prices 전체를 GROUP BY/윈도우로 훑지 않고, LIMIT이 있으면 그만큼의 종목만 조회합니다.
         query = """
-            SELECT
-                c.id, df.code, c.name, df.pbr, df.per, df.indust_per, df.eps, df.roe, df.bps, df.eps_pred, df.roe_pred, df.bps_pred,
-                df.perf_yoy, df.perf_vs_3m_ago, df.div_yield, df.max_daily_fall_rate, df.beta,
-                p_latest.close_price AS current_price
-            FROM
-                daily_financials AS df
-            JOIN
-                companies AS c ON df.code = c.code
-            JOIN
-                (
-                    SELECT code, MAX(date) as max_date
-                    FROM daily_financials
-                    WHERE date <= %s
-                    GROUP BY code
-                ) AS latest_df ON df.code = latest_df.code AND df.date = latest_df.max_date
-            JOIN
-                (
-                    SELECT
-                        company_id,
-                        close_price,
-                        ROW_NUMBER() OVER(PARTITION BY company_id ORDER BY trade_date DESC) as rn
-                    FROM prices
-                ) AS p_latest ON c.id = p_latest.company_id AND p_latest.rn = 1
-            WHERE
-                c.code LIKE '%%0'
+            SELECT * FROM (
+                SELECT
+                    df.company_id, df.code, c.name, df.pbr, df.per, df.indust_per, df.eps, df.roe, df.bps, df.eps_pred, df.roe_pred, df.bps_pred,
+                    df.perf_yoy, df.perf_vs_3m_ago, df.div_yield, df.max_daily_fall_rate, df.beta,
+                    (
+                        SELECT p.close_price
+                        FROM prices AS p
+                        WHERE p.company_id = df.company_id
+                        ORDER BY p.trade_date DESC
+                        LIMIT 1
+                    ) AS current_price
+                FROM
+                    daily_financials AS df
+                JOIN
+                    (
+                        SELECT code, MAX(date) as max_date
+                        FROM daily_financials
+                        WHERE date <= %s
+                        GROUP BY code
+                    ) AS latest_df ON df.code = latest_df.code AND df.date = latest_df.max_date
+                JOIN
+                    companies AS c ON c.id = df.company_id
+                WHERE
+                    c.is_primary = 1
+            ) AS t
+            WHERE t.current_price IS NOT NULL
         """
         params = [date_str]
         if limit:
             query += " LIMIT %s"
             params.append(int(limit))
 
-        # fetch_all이 파라미터를 지원하고, 결과가 튜플 리스트라고 가정합니다.
-        rows = self.db_access.fetch_all(query, params)
-        if not rows:
-            return []
-
         columns = [
             'id', 'code', 'name', 'pbr', 'per', 'indust_per', 'eps', 'roe', 'bps', 'eps_pred', 'roe_pred', 'bps_pred',
             'perf_yoy', 'perf_vs_3m_ago', 'div_yield', 'max_daily_fall_rate', 'beta', 'current_price'
         ]
-        return [dict(zip(columns, row)) for row in rows]
+        for rows in self.db_access.fetch_iter(query, params, size=self.VALUATION_CHUNK_ROWS):
+            yield pd.DataFrame.from_records(rows, columns=columns)
 
     def _prepare_data(self, stock_data):
-        """데이터를 추출하고 숫자형으로 변환합니다."""
+        """평가에 필요한 값만 추출합니다 (숫자 변환은 _get_valuation_inputs()에서 컬럼 단위로 이미 완료)."""
         data = {key: stock_data.get(key) for key in [
             'id', 'code', 'name', 'current_price', 'pbr', 'per', 'indust_per',
             'eps', 'roe', 'bps', 'eps_pred', 'roe_pred', 'bps_pred',
             'perf_yoy', 'perf_vs_3m_ago', 'div_yield', 'max_daily_fall_rate', 'beta'
         ]}
-        
-        for key, value in data.items():
-            if key in ['id', 'code', 'name']:
-                continue
-            if isinstance(value, (int, float)):
-                continue
-            try:
-                # Decimal 타입을 float으로 변환
-                data[key] = float(value)
-            except (ValueError, TypeError, AttributeError):
-                # 변환 실패 시 None으로 처리하지 않고 원래 값을 유지 (perf* 필드 등)
-                pass
         return data
 
-    def _calculate_growth_rates(self, data):
-        """EPS, BPS, ROE 성장률을 계산합니다."""
-        rates = {'eps_growth_rate': 0, 'bps_growth_rate': 0, 'roe_growth_rate': 0}
-        
-        if data.get('eps') and data['eps'] > 0 and data.get('eps_pred'):
-            rates['eps_growth_rate'] = ((data['eps_pred'] - data['eps']) / data['eps']) * 100
-        
-        if data.get('bps') and data['bps'] > 0 and data.get('bps_pred'):
-            rates['bps_growth_rate'] = ((data['bps_pred'] - data['bps']) / data['bps']) * 100
-            
-        if data.get('roe') and data['roe'] > 0 and data.get('roe_pred'):
-            rates['roe_growth_rate'] = ((data['roe_pred'] - data['roe']) / data['roe']) * 100
-            
-        return rates
-
     def _calculate_discount_rate(self, beta, max_daily_fall_rate):
         """종목별 할인율을 계산합니다 (소수 반환, 예: 0.085).
 
@@ -257,71 +360,53 @@ class ValuationManager:
         r = min(r, self.MAX_DISCOUNT_RATE)
         return r / 100
 
-    def _calculate_fair_value_rim(self, data, discount_rate):
-        """RIM 모델 기반 적정주가를 계산합니다 (성장률 g 반영).
+    def _row_math(self, data, discount_rate):
+        """단일 종목의 성장률과 RIM/업종 PER/PEGR 적정주가를 계산해 가중 혼합 + 안전마진을 적용합니다.
 
-        공식: P = BPS_pred + (ROE_pred - r) × BPS_pred / (r - g)
-        - g: BPS 성장률로 추정한 지속가능 성장률 (Gordon Growth 조건: g < r 보장)
+        RIM 공식: P = BPS_pred + (ROE_pred - r) × BPS_pred / (r - g)
+        - g: BPS 성장률로 추정한 지속가능 성장률 (Gordon Growth 조건: g < r 보장, 하한 -30%)
         - g = 0 일 때 구 공식(P = BPS × ROE / r)과 동일
-        """
-        roe_pred = data.get('roe_pred')
-        bps_pred = data.get('bps_pred')
-        bps = data.get('bps')
-
-        if roe_pred is None or bps_pred is None or roe_pred < 0 or bps_pred <= 0:
-            return 0
-
-        r = discount_rate  # 소수 (예: 0.08)
-
-        # BPS 성장률로 지속가능 성장률 g 추정
-        g = 0.0
-        if bps and float(bps) > 0:
-            g = (float(bps_pred) - float(bps)) / float(bps)
-
-        # Gordon Growth 조건: g < r, 하한 -30% (과도한 축소 방지)
-        g = max(-0.30, min(g, r * self.RIM_MAX_G_RATIO))
+        0 이하인 모델은 혼합에서 제외합니다.
 
-        excess_profit = (float(roe_pred) / 100 - r) * float(bps_pred)
-        denominator = r - g
-        if abs(denominator) < 1e-6:
-            return float(bps_pred)
-
-        return max(0.0, float(bps_pred) + excess_profit / denominator)
-
-    def _calculate_fair_value_per(self, data):
-        """업종 PER 모델 기반 적정주가를 계산합니다."""
+        Returns:
+            tuple: (적정주가, EPS 성장률, BPS 성장률, ROE 성장률) — 모든 모델이 0 이하면 적정주가 0
+        """
+        eps, eps_pred = data.get('eps'), data.get('eps_pred')
+        bps, bps_pred = data.get('bps'), data.get('bps_pred')
+        roe, roe_pred = data.get('roe'), data.get('roe_pred')
         indust_per = data.get('indust_per')
-        eps_pred = data.get('eps_pred')
-        if indust_per is not None and eps_pred is not None and indust_per > 0 and eps_pred > 0:
-            return eps_pred * indust_per
-        return 0
-
-    def _calculate_fair_value_pegr(self, data, eps_growth_rate):
-        """PEGR 모델 기반 적정주가를 계산합니다."""
-        eps_pred = data.get('eps_pred')
-        if eps_pred is not None and eps_pred > 0 and \
-           eps_growth_rate is not None and self.PEGR_MIN_GROWTH < eps_growth_rate < self.PEGR_MAX_GROWTH:
-            return eps_growth_rate * eps_pred
-        return 0
-
-    def _blend_and_apply_margin(self, fv_rim, fv_per, fv_pegr):
-        """여러 모델의 적정주가를 혼합하고 안전마진을 적용합니다."""
-        weighted_sum, total_weight = 0, 0
-        
-        if fv_rim > 0:
-            weighted_sum += fv_rim * self.W_RIM
-            total_weight += self.W_RIM
-        if fv_per > 0:
-            weighted_sum += fv_per * self.W_PER
-            total_weight += self.W_PER
-        if fv_pegr > 0:
-            weighted_sum += fv_pegr * self.W_PEGR
-            total_weight += self.W_PEGR
-            
+
+        # 성장률 (기준값이 0보다 크고 예측값이 있을 때만, 아니면 0)
+        eps_g = (eps_pred - eps) / eps * 100 if eps and eps > 0 and eps_pred else 0
+        bps_g = (bps_pred - bps) / bps * 100 if bps and bps > 0 and bps_pred else 0
+        roe_g = (roe_pred - roe) / roe * 100 if roe and roe > 0 and roe_pred else 0
+
+        # RIM
+        fv_rim = 0
+        if roe_pred is not None and bps_pred is not None and roe_pred >= 0 and bps_pred > 0:
+            r = discount_rate  # 소수 (예: 0.08)
+            g = (bps_pred - bps) / bps if bps and bps > 0 else 0.0
+            g = max(-0.30, min(g, r * self.RIM_MAX_G_RATIO))
+            denominator = r - g
+            if abs(denominator) < 1e-6:
+                fv_rim = bps_pred
+            else:
+                fv_rim = max(0.0, bps_pred + (roe_pred / 100 - r) * bps_pred / denominator)
+
+        # 업종 PER / PEGR
+        has_eps_pred = eps_pred is not None and eps_pred > 0
+        fv_per = eps_pred * indust_per if has_eps_pred and indust_per is not None and indust_per > 0 else 0
+        fv_pegr = eps_g * eps_pred if has_eps_pred and self.PEGR_MIN_GROWTH < eps_g < self.PEGR_MAX_GROWTH else 0
+
+        # 가중 혼합 + 안전마진 (bool × 가중치로 분기 없이 계산)
+        w_rim = (fv_rim > 0) * self.W_RIM
+        w_per = (fv_per > 0) * self.W_PER
+        w_pegr = (fv_pegr > 0) * self.W_PEGR
+        total_weight = w_rim + w_per + w_pegr
+        fair_value = 0
         if total_weight > 0:
-            blended_value = weighted_sum / total_weight
-            return blended_value * self.CONSERVATIVE_FACTOR
-        return 0
+            fair_value = (fv_rim * w_rim + fv_per * w_per + fv_pegr * w_pegr) / total_weight * self.CONSERVATIVE_FACTOR
+        return fair_value, eps_g, bps_g, roe_g
 
     def _classify_valuation(self, current_price, fair_value, per, eps_growth_rate):
         """최종 적정주가를 바탕으로 종목을 분류하고 관련 지표를 계산합니다."""
@@ -340,32 +425,18 @@ class ValuationManager:
             
         return result, discrepancy_ratio, peg_ratio
 
-    def _parse_perf_value(self, val):
-        """실적 이슈 텍스트를 숫자로 변환합니다."""
-        try:
-            return float(str(val).replace(',', '').replace('%', '').strip())
-        except (ValueError, TypeError, AttributeError):
-            return val
-
     def _perform_valuation_calculation(self, stock_data):
         """주어진 데이터를 바탕으로 개별 종목의 가치를 평가합니다."""
         try:
             data = self._prepare_data(stock_data)
-            growth_rates = self._calculate_growth_rates(data)
-
             discount_rate = self._calculate_discount_rate(data.get('beta'), data.get('max_daily_fall_rate'))
-
-            fv_rim = self._calculate_fair_value_rim(data, discount_rate)
-            fv_per = self._calculate_fair_value_per(data)
-            fv_pegr = self._calculate_fair_value_pegr(data, growth_rates['eps_growth_rate'])
-
-            fair_value = self._blend_and_apply_margin(fv_rim, fv_per, fv_pegr)
+            fair_value, eps_growth_rate, bps_growth_rate, roe_growth_rate = self._row_math(data, discount_rate)
             if fair_value <= 0:
                 logging.debug(f"'{data.get('code')}' 모든 모델의 적정주가가 0 이하 — 평가 불가 (ROE_pred={data.get('roe_pred')}, EPS_pred={data.get('eps_pred')})")
                 return None
 
             result, discrepancy_ratio, peg_ratio = self._classify_valuation(
-                data['current_price'], fair_value, data['per'], growth_rates['eps_growth_rate']
+                data['current_price'], fair_value, data['per'], eps_growth_rate
             )
 
             return {
@@ -375,39 +446,80 @@ class ValuationManager:
                 'discount_rate': round(discount_rate * 100, 2),
                 'discrepancy_ratio': round(discrepancy_ratio, 2),
                 'pbr': data['pbr'], 'per': data['per'], 'roe': data['roe'],
-                'eps_growth_rate': round(growth_rates['eps_growth_rate'], 2),
-                'bps_growth_rate': round(growth_rates['bps_growth_rate'], 2),
-                'roe_growth_rate': round(growth_rates['roe_growth_rate'], 2),
+                'eps_growth_rate': round(eps_growth_rate, 2),
+                'bps_growth_rate': round(bps_growth_rate, 2),
+                'roe_growth_rate': round(roe_growth_rate, 2),
                 'peg_ratio': round(peg_ratio, 2) if peg_ratio is not None else None,
                 'result': result,
-                'perf_yoy': self._parse_perf_value(data['perf_yoy']),
-                'perf_vs_3m_ago': self._parse_perf_value(data['perf_vs_3m_ago']),
+                'perf_yoy': data['perf_yoy'],
+                'perf_vs_3m_ago': data['perf_vs_3m_ago'],
             }
         except Exception as e:
             logging.error(f"'{stock_data.get('code')}' 가치 평가 계산 중 오류: {e}")
             return None
 
+    def _perform_valuation_bulk(self, all_data):
+        """전체 종목의 가치 평가를 컬럼 단위(NumPy 벡터 연산)로 한 번에 수행합니다.
+
+        all_data는 _iter_valuation_data_bulk()가 반환한 DataFrame (청크)입니다.
+        _perform_valuation_calculation()과 같은 공식을 사용하며, 결과도 같은 형태의 dict 리스트로 반환합니다.
+        """
+        # 필수 데이터 확인 (None 이면 계산 불가)
+        df = all_data.dropna(subset=['code', 'roe_pred', 'bps_pred', 'current_price']).reset_index(drop=True)
+        if len(df) < len(all_data):
+            logging.debug(f"충분한 데이터가 없는 {len(all_data) - len(df)}개 종목은 평가를 건너뜁니다.")
+        if df.empty:
+            return []
+
+        numeric_cols = ['current_price', 'pbr', 'per', 'indust_per', 'eps', 'roe', 'bps',
+                        'eps_pred', 'roe_pred', 'bps_pred', 'div_yield', 'max_daily_fall_rate', 'beta']
+        num = {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) for col in numeric_cols}
+
+        (eps_growth_rate, bps_growth_rate, roe_growth_rate, r,
+         fair_value, discrepancy_ratio, peg_ratio, result_code) = _valuation_kernel(
+            num, self.REQUIRED_ROE, self.RISK_FREE_RATE, self.EQUITY_RISK_PREMIUM, self.RISK_FACTOR,
+            self.MAX_DISCOUNT_RATE, self.RIM_MAX_G_RATIO, (self.W_RIM, self.W_PER, self.W_PEGR),
+            self.CONSERVATIVE_FACTOR, self.PEGR_MIN_GROWTH, self.PEGR_MAX_GROWTH,
+            self.LOW_VALUATION_THRESHOLD, self.HIGH_VALUATION_THRESHOLD
+        )
+        current_price, per = num['current_price'], num['per']
+        # int8 결과 코드 → 평가 결과 문자열
+        result = np.array([self._RESULT_UNDERVALUED, self._RESULT_FAIR, self._RESULT_OVERVALUED], dtype=object)[result_code]
+
+        out = pd.DataFrame({
+            'id': df['id'], 'code': df['code'], 'name': df['name'], 'current_price': current_price,
+            'fair_value': np.round(fair_value, 2),
+            'discount_rate': np.round(r * 100, 2),
+            'discrepancy_ratio': np.round(discrepancy_ratio, 2),
+            'pbr': num['pbr'], 'per': per, 'roe': num['roe'],
+            'eps_growth_rate': np.round(eps_growth_rate, 2),
+            'bps_growth_rate': np.round(bps_growth_rate, 2),
+            'roe_growth_rate': np.round(roe_growth_rate, 2),
+            'peg_ratio': np.round(peg_ratio, 2),
+            'result': result,
+            'perf_yoy': pd.to_numeric(df['perf_yoy'], errors='coerce'),
+            'perf_vs_3m_ago': pd.to_numeric(df['perf_vs_3m_ago'], errors='coerce'),
+        })
+
+        # 모든 모델의 적정주가가 0 이하인 종목은 평가 불가
+        out = out[fair_value > 0]
+        return out.astype(object).where(out.notna(), None).to_dict('records')
+
     def _save_results_to_db(self, results, date_str):
-        """평가 결과를 DB에 저장합니다."""
+        """평가 결과를 DB에 저장합니다.
+
+        LOAD DATA로 임시 staging 테이블에 적재한 뒤 INSERT…SELECT 한 번으로 valuations에 병합하고,
+        LOAD DATA를 쓸 수 없으면(local_infile 비활성 등) multi-row INSERT로 저장합니다.
+        """
         try:
-            query = """
-            INSERT INTO valuations (
-                code, date, fair_value, current_price, discrepancy_ratio,
-                eps_growth_rate, peg_ratio, valuation_result
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                fair_value = VALUES(fair_value),
-                current_price = VALUES(current_price),
-                discrepancy_ratio = VALUES(discrepancy_ratio),
-                eps_growth_rate = VALUES(eps_growth_rate),
-                peg_ratio = VALUES(peg_ratio),
-                valuation_result = VALUES(valuation_result)
-            """
             params = [(r['code'], date_str, r['fair_value'], r['current_price'],
                        r['discrepancy_ratio'], r['eps_growth_rate'], r.get('peg_ratio'), r['result']) for r in results]
-            
-            self.db_access.execute_many_query(query, params)
-            logging.info(f"가치 평가 결과를 DB에 저장했습니다. ({len(results)}건)")
+
+            saved = self.db_access.upsert_via_staging(
+                'valuations', 'valuations_staging', self.VALUATION_COLUMNS, params, self.VALUATION_UPSERT_SUFFIX
+            )
+            if saved is not None:
+                logging.info(f"가치 평가 결과를 DB에 저장했습니다. ({len(results)}건)")
         except Exception as e:
             logging.error(f"DB 저장 중 오류 발생: {e}")
 
@@ -417,100 +529,91 @@ class ValuationManager:
             logging.info("저장할 가치 평가 결과가 없습니다.")
             return
 
+        # openpyxl은 보고서 저장 시에만 필요하므로 여기서 import (모듈 로딩 시간 단축)
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import PatternFill, Font, Border, Side, Alignment
+        from openpyxl.utils import get_column_letter
+
         try:
-            df = pd.DataFrame(results)
-            
-            # id (기업 DB 기본키, companies 삽입 순서 ≈ 시가총액 순) 기준으로 정렬 후 컬럼 제거
-            if 'id' in df.columns:
-                # None 값이 있을 경우를 대비해 처리 (기본적으로 맨 뒤로)
-                df['id'] = pd.to_numeric(df['id'], errors='coerce')
-                df = df.sort_values(by='id', na_position='last')
-                df = df.drop(columns=['id'])
-            
+            # id (기업 DB 기본키, companies 삽입 순서 ≈ 시가총액 순) 기준으로 정렬 (None은 맨 뒤로), id 컬럼은 제외
+            rows = sorted(results, key=lambda r: (r.get('id') is None, r.get('id') or 0))
+            columns = [col for col in results[0] if col != 'id']
+
             # 컬럼 순서 조정: name을 code 바로 뒤로 이동
-            if 'name' in df.columns:
-                cols = df.columns.tolist()
-                cols.insert(1, cols.pop(cols.index('name')))
-                df = df[cols]
+            if 'name' in columns:
+                columns.insert(1, columns.pop(columns.index('name')))
 
             report_dir = 'reports'
             os.makedirs(report_dir, exist_ok=True)
             filename = os.path.join(report_dir, f'valuation_results_{date_str}.xlsx')
-            
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Valuation')
-                worksheet = writer.sheets['Valuation']
-
-                # 컬럼 인덱스 매핑
-                col_map = {col: idx + 1 for idx, col in enumerate(df.columns)}
-
-                # 0. Code 컬럼 텍스트 포맷 적용
-                if 'code' in col_map:
-                    code_col_idx = col_map['code']
-                    for row in range(2, worksheet.max_row + 1):
-                        cell = worksheet.cell(row=row, column=code_col_idx)
-                        cell.number_format = '@'
-
-                # 1. 숫자 포맷 적용 (천 단위 콤마, 소수점 제거)
-                for col_name in ['current_price', 'fair_value']:
-                    if col_name in col_map:
-                        col_idx = col_map[col_name]
-                        for row in range(2, worksheet.max_row + 1):
-                            cell = worksheet.cell(row=row, column=col_idx)
-                            cell.number_format = '#,##0'
-
-                # 1-1. 소수점 2자리 포맷 적용 (실적 지표, 할인율)
-                for col_name in ['perf_yoy', 'perf_vs_3m_ago', 'discount_rate']:
-                    if col_name in col_map:
-                        col_idx = col_map[col_name]
-                        for row in range(2, worksheet.max_row + 1):
-                            cell = worksheet.cell(row=row, column=col_idx)
-                            if isinstance(cell.value, (int, float)):
-                                cell.number_format = '0.00'
-
-                # 2. '저평가' 종목 행 전체 배경색 적용
-                if 'result' in col_map:
-                    result_col_idx = col_map['result']
-                    undervalued_fill = PatternFill(start_color='FFFF99', end_color='FFFF99', fill_type='solid')
-                    
-                    for row_num in range(2, worksheet.max_row + 1):
-                        result_cell = worksheet.cell(row=row_num, column=result_col_idx)
-                        if result_cell.value == self._RESULT_UNDERVALUED:
-                            for col_num in range(1, worksheet.max_column + 1):
-                                worksheet.cell(row=row_num, column=col_num).fill = undervalued_fill
-
-                # 2-1. discrepancy_ratio가 -30보다 작은 행 전체 bold 적용
-                if 'discrepancy_ratio' in col_map:
-                    discrepancy_col_idx = col_map['discrepancy_ratio']
-                    bold_font = Font(bold=True)
-                    
-                    for row_num in range(2, worksheet.max_row + 1):
-                        discrepancy_cell = worksheet.cell(row=row_num, column=discrepancy_col_idx)
-                        if discrepancy_cell.value is not None:
-                            try:
-                                discrepancy_value = float(discrepancy_cell.value)
-                                if discrepancy_value < -30:
-                                    for col_num in range(1, worksheet.max_column + 1):
-                                        cell = worksheet.cell(row=row_num, column=col_num)
-                                        cell.font = bold_font
-                            except (ValueError, TypeError):
-                                pass
-
-                # 3. 컬럼 너비 자동 조정
-                for column_cells in worksheet.columns:
-                    max_length = 0
-                    col_letter = column_cells[0].column_letter
-                    for cell in column_cells:
-                        try:
-                            if cell.value:
-                                # 한글 등 멀티바이트 문자 고려하여 길이 계산 (한글은 길이를 더 크게 잡음)
-                                cell_len = len(str(cell.value)) + sum(1 for c in str(cell.value) if ord(c) > 127)
-                                if cell_len > max_length:
-                                    max_length = cell_len
-                        except:
-                            pass
-                    worksheet.column_dimensions[col_letter].width = max_length + 2
 
+            # write_only 워크북: 행을 바로 파일로 흘려보내 전체 시트를 메모리에 유지하지 않음
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet('Valuation')
+
+            # 컬럼 너비 자동 조정 (write_only 모드에서는 행을 쓰기 전에 설정해야 함)
+            # 한글 등 멀티바이트 문자 고려하여 길이 계산 (비ASCII 문자는 2칸으로 계산), 컬럼 단위 문자열 연산으로 한 번에 처리
+            def display_len(text):
+                return text.str.len() + text.str.count(r'[^\x00-\x7f]')
+
+            frame = pd.DataFrame.from_records(rows, columns=columns)
+            values = frame.astype(str).where(frame.notna())
+            widths = values.apply(display_len).max().fillna(0)
+            header_widths = display_len(pd.Series(columns, index=columns, dtype=str))
+            for idx, col in enumerate(columns, start=1):
+                max_length = max(int(header_widths[col]), int(widths[col]))
+                worksheet.column_dimensions[get_column_letter(idx)].width = max_length + 2
+
+            # 헤더 (pandas to_excel 기본 헤더 스타일과 동일하게 굵게/테두리/가운데 정렬)
+            thin = Side(style='thin')
+            header_font = Font(bold=True)
+            header_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            header_alignment = Alignment(horizontal='center', vertical='top')
+            header = []
+            for col in columns:
+                cell = WriteOnlyCell(worksheet, value=col)
+                cell.font, cell.border, cell.alignment = header_font, header_border, header_alignment
+                header.append(cell)
+            worksheet.append(header)
+
+            # 컬럼별 숫자 서식은 한 번만 결정 (셀마다 컬럼명 분기하지 않음)
+            column_formats = [self._EXCEL_NUMBER_FORMATS.get(col) for col in columns]
+            undervalued_fill = PatternFill(start_color='FFFF99', end_color='FFFF99', fill_type='solid')
+            bold_font = Font(bold=True)
+
+            def make_cell(value, number_format, fill, font):
+                # 소수점 서식은 숫자 값에만 적용 (값이 없는 None 셀은 서식 없이 기록)
+                if number_format == '0.00' and not isinstance(value, (int, float)):
+                    number_format = None
+                # 서식이 없는 셀은 WriteOnlyCell 생성/스타일 등록 없이 값만 기록
+                if not (number_format or fill or font):
+                    return value
+                cell = WriteOnlyCell(worksheet, value=value)
+                if number_format:
+                    cell.number_format = number_format
+                if fill:
+                    cell.fill = fill
+                if font:
+                    cell.font = font
+                return cell
+
+            for r in rows:
+                # '저평가' 종목 행 전체 배경색, discrepancy_ratio가 -30보다 작은 행 전체 bold
+                fill = undervalued_fill if r.get('result') == self._RESULT_UNDERVALUED else None
+                font = None
+                try:
+                    if r.get('discrepancy_ratio') is not None and float(r['discrepancy_ratio']) < -30:
+                        font = bold_font
+                except (ValueError, TypeError):
+                    pass
+
+                worksheet.append([
+                    make_cell(r.get(col), number_format, fill, font)
+                    for col, number_format in zip(columns, column_formats)
+                ])
+
+            workbook.save(filename)
             logging.info(f"가치 평가 결과를 '{filename}' 파일로 성공적으로 저장했습니다.")
         except Exception as e:
             logging.error(f"Excel 파일 저장 중 오류 발생: {e}")
@@ -37,6 +37,9 @@ if __name__ == "__main__":
         if not stock_manager.create_tables():
             logging.error("주식 관련 테이블 생성에 실패하여 스크립트를 중단합니다.")
             exit()
+        if os.getenv('MIGRATE_PERF_NUMERIC') == '1':
+            # 1회성: 기존 daily_financials의 실적이슈 문자열 컬럼을 DECIMAL로 변환
+            stock_manager.migrate_perf_columns_to_decimal()
         valuation_manager.create_valuation_table()
         logging.info("[1/5] 데이터베이스 테이블 생성 완료.")
 
@@ -45,7 +48,11 @@ if __name__ == "__main__":
         # 2. 주식 정보 및 가격 처리
         logging.info("[2/5] 주식 정보 및 가격 데이터 업데이트 시작...")
         stock_manager.save_stock_info(limit=limit)
-        stock_manager.save_daily_prices(start_date=start_date_str, limit=limit)
+        if os.getenv('PRICE_BULK_SEED') == '1':
+            # 최초 적재 시에만 인덱스 제거/재생성 경로 사용 (prices 테이블이 비어 있을 때만 동작)
+            stock_manager.save_daily_prices_bulk(start_date=start_date_str, limit=limit)
+        else:
+            stock_manager.save_daily_prices(start_date=start_date_str, limit=limit)
         stock_manager.update_risk_metrics(limit=limit)
         logging.info("[2/5] 주식 정보 및 가격 데이터 업데이트 완료.")
 